@@ -1,125 +1,659 @@
-import copy
+import logging
+import threading
+import time
 
-class AIPlayer:
-    def __init__(self, board):
-        """Initialize AI player with access to the board."""
-        self.board = board
+from evaluation import PIECE_VALUES, CHECK_BONUS, MATE_SCORE, DELTA_MARGIN, score_batch
+from logs import get_logger
+from profiler import SamplingProfiler
+from tablebase import MAX_PIECES, WIN, LOSS
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from zobrist import ZOBRIST_BLACK_TO_MOVE
 
-    def evaluate(self, player):
-        """Evaluate the board and assign scores based on piece strength and game state."""
-        white_score = 0
-        black_score = 0
+logger = get_logger(__name__)
 
-        # Piece values for evaluation
-        piece_values = {
-            'p': 1, 't': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 1000,  # Black pieces
-            'P': 1, 'T': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 1000   # White pieces
-        }
+# Move ordering scores: hash/PV move, then captures (MVV-LVA), then killer
+# moves, then quiet moves by history score.
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORE = 1 << 20
 
-        # Calculate total score for both sides
-        for row in self.board.board:
-            for piece in row:
-                if piece in piece_values:
-                    if piece.isupper():
-                        white_score += piece_values[piece]
-                    else:
-                        black_score += piece_values[piece]
+# Depth taken off the reduced search after a null move
+NULL_MOVE_REDUCTION = 2
+# Quiet moves after this many are searched one ply shallower first
+LMR_MIN_MOVES = 3
+
+clock = time.perf_counter
+# Shallower searches stay in this process even with workers > 1: below it the
+# workers' task overhead costs more than splitting the root saves
+PARALLEL_MIN_DEPTH = 4
+# Scores beyond this are mates (or tablebase wins and losses) in some plies
+MATE_BOUND = MATE_SCORE - 10000
 
-        enemy = 'black' if player == 'white' else 'white'
 
-        # Add bonus for check and checkmate
-        if self.board.is_in_check(enemy):
-            white_score += 5 if player == 'white' else -5
-        if self.board.is_checkmate(enemy):
-            white_score += 100 if player == 'white' else -100
+class SearchTimeout(Exception):
+    """Raised inside negamax when the time or node budget runs out."""
 
-        for row in self.board.board:
-            for piece in row:
-                if(piece == 'P' and row == 0):
-                    white_score += 7
-                if(piece == 'p' and row == 7):
-                    black_score += 7
 
-        # Return evaluation based on the player
-        return white_score - black_score if player == 'white' else black_score - white_score
+def tablebase_score(result, ply):
+    """Negamax score of a tablebase (outcome, plies) found ply moves from the root."""
+    outcome, plies = result
+    if outcome == WIN:
+        return MATE_SCORE - (ply + plies)
+    if outcome == LOSS:
+        return -(MATE_SCORE - (ply + plies))
+    return 0
 
-    def get_best_move(self, player, depth=4):
-        """Find the best possible move using MinMax with Alpha-Beta pruning."""
-        print(f"AI thinking for {player} at depth {depth}")
 
-        pieces = self.board.get_pieces_with_legal_moves(player)
-        legal_moves = []
+def score_to_tt(score, ply):
+    """Make a mate score count from this node, not the root, before storing it."""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
 
-        # Ensure AI only considers legal moves
-        for piece in pieces:
-            moves = self.board.get_list_of_legal_moves(piece)
-            for move in moves:
-                if self.board.is_move_legal(piece, move):  # Double-check legality
-                    legal_moves.append((piece, move))
 
-        print(f"🧠 AI legal moves: {legal_moves}")
+def score_from_tt(score, ply):
+    """Turn a stored mate score back into a distance from the root at this ply."""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class AIPlayer:
+    def __init__(self, board, tt_size_bits=16, use_move_ordering=True, use_check_bonus=True,
+                 workers=1, opening_book=None, use_quiescence=True, use_null_move=True,
+                 use_late_move_reductions=True, tablebase=None, metrics=None, move_cache=None):
+        """Initialize AI player with access to the board.
+
+        With workers > 1 root moves of searches at least PARALLEL_MIN_DEPTH
+        deep are searched in parallel processes (see parallel.py). An
+        OpeningBook, if given, is consulted before searching. A Tablebase,
+        if given, answers endgames with few pieces exactly, at the root and
+        inside the search. A MoveCache, if given,
+        answers positions searched before with the same settings and keeps
+        the moves of completed searches. Every move chosen outside pondering
+        is reported to metrics (a SearchMetrics), if given.
+        """
+        self.metrics = metrics
+        self.move_cache = move_cache
+        self.board = board
+        self.workers = workers
+        self.opening_book = opening_book
+        self.tablebase = tablebase
+        # Positions scored by the tablebase in the last search
+        self.tablebase_hits = 0
+        # Resolve pending captures at the leaves before evaluating
+        self.use_quiescence = use_quiescence
+        # Selective search; both trade a little accuracy for far fewer nodes
+        self.use_null_move = use_null_move
+        self.use_late_move_reductions = use_late_move_reductions
+        # Reward positions where the opponent is in check (costs one
+        # is_in_check call per leaf).
+        self.use_check_bonus = use_check_bonus
+        # Number of negamax and quiescence nodes visited by the last search.
+        self.nodes = 0
+        self.qnodes = 0
+        # Kept for the lifetime of the player so later turns reuse earlier work.
+        self.tt = TranspositionTable(tt_size_bits)
+        # Search budget, set by get_best_move
+        self.deadline = None
+        # extend_search may move the deadline from another thread: before
+        # the search starts it leaves pending_deadline for start_search
+        self.budget_lock = threading.Lock()
+        self.searching = False
+        self.pending_deadline = None
+        self.node_limit = None
+        self.can_abort = False
+        # A threading.Event that stops the search when set (used to cancel
+        # pondering), or None
+        self.stop_event = None
+        # Deepest fully searched iteration of the last search.
+        self.completed_depth = 0
+        # Move ordering state: two killer moves per ply and a history score
+        # per (from, to) for quiet moves that caused a cutoff.
+        self.use_move_ordering = use_move_ordering
+        self.killers = []
+        self.history = {}
+        # Beta cutoffs in the last search, and how many came from the first move
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Nodes searched by each completed iteration of the last search
+        self.iteration_nodes = []
+        # Best line per ply while searching, and the last completed iteration's
+        # principal variation as a list of (from, to) moves
+        self.pv = []
+        self.principal_variation = []
+        # Wall-clock time of the last search, per iteration and by phase:
+        # legal move generation, evaluate (with its check test) and the
+        # search's own in-check tests
+        self.search_start = 0.0
+        self.search_seconds = 0.0
+        self.iteration_seconds = []
+        self.phase_seconds = dict.fromkeys(('movegen', 'evaluate', 'check'), 0.0)
+        self.tt_probes_before = 0
+        self.tt_hits_before = 0
+        # When set to a file path, the next search is sampled and its profile
+        # written there as collapsed stacks (see profiler.py)
+        self.profile_path = None
+        # How the last ponder search chose its move, reported to metrics only
+        # if the move gets played: (source, cache lookup hit or None)
+        self.pondered = None
+
+    def evaluate(self, player, in_check=None):
+        """Evaluate the board from player's point of view, in centipawns.
+
+        Material and piece-square scores are kept up to date by the board on
+        every move, so this is a lookup plus the optional check bonus (a
+        penalty when player is in check; pass in_check if it is known).
+        Checkmate is scored by the search, which knows when no moves are left.
+        """
+        score = self.board.score if player == 'white' else -self.board.score
+        if self.use_check_bonus:
+            if in_check is None:
+                in_check = self.board.is_in_check(player)
+            if in_check:
+                score -= CHECK_BONUS
+        return score
+
+    def leaf_check(self, player):
+        """Return (in check, checkmated) for player at a leaf, before it is evaluated.
+
+        Only a player in check is searched for a legal move, so quiet leaves
+        pay for one check test, which evaluate then reuses.
+        """
+        started = clock()
+        in_check = self.board.is_in_check(player)
+        mated = in_check and not self.board.has_legal_move(player)
+        self.phase_seconds['check'] += clock() - started
+        return in_check, mated
+
+    def get_best_move(self, player, depth=4, time_limit=None, node_limit=None, ponder=False):
+        """Find the best possible move using negamax with alpha-beta pruning.
+
+        Searches depth 1, 2, ... up to depth, trying the previous iteration's
+        best move first. If time_limit (seconds) or node_limit runs out, the
+        result of the last completed iteration is returned. Depth 1 always
+        completes so there is a move to play.
+
+        A ponder search is not profiled, and reaches metrics only through
+        report_pondered, once its move is played.
+        """
+        debug = logger.isEnabledFor(logging.DEBUG)
+        cache_hit = None
+        if self.move_cache is not None:
+            # Checked first: a hit needs no move generation at all
+            cached_move = self.move_cache.get(self.board, player, self.cache_settings(depth))
+            cache_hit = cached_move is not None
+            if cached_move:
+                logger.debug("AI chose cached move: %s", cached_move)
+                self.principal_variation = [cached_move]
+                self.report('cache', cache_hit, ponder)
+                return cached_move
+
+        legal_moves = self.board.get_all_legal_moves(player)
+        if debug:
+            logger.debug("AI thinking for %s at depth %d; legal moves: %s",
+                         player, depth, legal_moves)
 
         if not legal_moves:
-            print(f"No legal moves available for {player}")
+            logger.debug("No legal moves available for %s", player)
             return None
 
-        # Run MinMax algorithm to determine the best move
-        best_move, best_score = self.minmax(player, depth, float('-inf'), float('inf'), True)
-        print(f"AI chose move: {best_move} with score: {best_score}")
+        if self.opening_book is not None:
+            book_move = self.opening_book.best_move(self.board, player)
+            if book_move:
+                logger.debug("AI chose book move: %s", book_move)
+                self.report('book', cache_hit, ponder)
+                return book_move
+
+        if self.tablebase is not None and self.board.count_pieces() <= MAX_PIECES:
+            tablebase_move = self.tablebase.best_move(self.board, player)
+            if tablebase_move:
+                logger.debug("AI chose tablebase move: %s", tablebase_move)
+                self.principal_variation = [tablebase_move]
+                self.report('tablebase', cache_hit, ponder)
+                return tablebase_move
 
-        print("👀 Board before AI move:")
-        self.board.draw_board()
+        # Run negamax to determine the best move
+        self.start_search(time_limit, node_limit)
+        profiler = None
+        if self.profile_path and not ponder:
+            profiler = SamplingProfiler()
+            profiler.start()
+
+        try:
+            if self.workers > 1 and depth >= PARALLEL_MIN_DEPTH:
+                from parallel import parallel_root_search
+                best_move, best_score = parallel_root_search(self, player, depth, self.workers,
+                                                             time_limit, node_limit)
+            else:
+                best_move, best_score = self.iterative_deepening(player, depth)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                profiler.write(self.profile_path)
+                logger.info("Search profile (%d samples) written to %s",
+                            profiler.samples, self.profile_path)
+                self.profile_path = None
+
+        self.end_search()
+        self.search_seconds = time.perf_counter() - self.search_start
+        self.report('search', cache_hit, ponder)
+        if best_move is None:
+            # Every move scored as bad as possible; any legal move will do.
+            best_move = legal_moves[0]
+        elif self.move_cache is not None and self.completed_depth >= depth:
+            # Only full-depth results: a search cut short by its budget would
+            # answer for deeper ones
+            self.move_cache.put(self.board, player, self.cache_settings(depth), best_move)
+        if debug:
+            logger.debug("AI chose move: %s with score: %s (depth %d, %d nodes, "
+                         "%d quiescence nodes)", best_move, best_score, self.completed_depth,
+                         self.nodes, self.qnodes)
+            logger.debug("Principal variation: %s", self.principal_variation)
+            logger.debug("Transposition table: %s", self.tt.stats())
+            logger.debug("Search stats: %s", self.search_stats())
+            logger.debug("Board before AI move:\n%s",
+                         '\n'.join(' '.join(row) for row in self.board.get_state()))
 
         return best_move
 
-    def minmax(self, player, depth, alpha, beta, maximizing):
-        """MinMax algorithm with Alpha-Beta pruning."""
+    def report(self, source, cache_hit, ponder):
+        """Send a chosen move's source (and the cache lookup before it) to metrics."""
+        if ponder:
+            self.pondered = (source, cache_hit)
+            return
+        if self.metrics is None:
+            return
+        if cache_hit is not None:
+            self.metrics.record_cache_lookup(cache_hit)
+        self.metrics.record(source, self.search_stats() if source == 'search' else None)
+
+    def report_pondered(self):
+        """Report the last ponder search, whose move is being played."""
+        if self.pondered is not None:
+            self.report(*self.pondered, ponder=False)
+            self.pondered = None
+
+    def cache_settings(self, depth):
+        """The part of a MoveCache key that depends on how this player searches."""
+        features = ''.join('1' if enabled else '0' for enabled in (
+            self.use_move_ordering, self.use_check_bonus, self.use_quiescence,
+            self.use_null_move, self.use_late_move_reductions, self.tablebase is not None))
+        return f"{depth}:{features}"
+
+    def start_search(self, time_limit=None, node_limit=None):
+        """Reset the per-search counters and set the search budget."""
+        self.nodes = 0
+        self.qnodes = 0
+        self.tt.new_search()
+        with self.budget_lock:
+            if self.pending_deadline is not None:
+                self.deadline, self.pending_deadline = self.pending_deadline, None
+            else:
+                self.deadline = time.perf_counter() + time_limit if time_limit else None
+            self.searching = True
+        self.node_limit = node_limit
+        self.completed_depth = 0
+        self.killers = []
+        self.history = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.iteration_nodes = []
+        self.principal_variation = []
+        self.tablebase_hits = 0
+        self.iteration_seconds = []
+        self.phase_seconds = dict.fromkeys(self.phase_seconds, 0.0)
+        self.tt_probes_before = self.tt.probes
+        self.tt_hits_before = self.tt.hits
+        self.search_start = time.perf_counter()
+        self.search_seconds = 0.0
+
+    def end_search(self):
+        """Clear the search budget once a search is over."""
+        with self.budget_lock:
+            self.deadline = None
+            self.searching = False
+        self.node_limit = None
+
+    def extend_search(self, seconds):
+        """Give the search seconds from now; safe to call from another thread.
+
+        If the search has not reached start_search yet, the deadline is kept
+        for it and replaces its own time limit.
+        """
+        with self.budget_lock:
+            if self.searching:
+                self.deadline = time.perf_counter() + seconds
+            else:
+                self.pending_deadline = time.perf_counter() + seconds
+
+    def evaluate_batch(self, positions):
+        """Score a list of Positions (see position.py) from each side to move's view.
+
+        Material and piece-square values only: the check bonus needs move
+        generation, so it is left out. The batch is scored with NumPy when
+        it is installed.
+        """
+        scores = score_batch([position.squares for position in positions])
+        return [score if position.side == 'white' else -score
+                for position, score in zip(positions, scores)]
+
+    def search_batch(self, positions, depth=4, time_limit=None, node_limit=None):
+        """Search each Position on this player's board, quietly.
+
+        Returns a list of (best move, score), with the score from the side to
+        move's view and (None, None) where there is no legal move. The time
+        and node limits apply to each position. The transposition table is
+        kept between positions, which helps when they come from one game.
+        """
+        results = []
+        for position in positions:
+            self.board.set_state(position.grid())
+            legal_moves = self.board.get_all_legal_moves(position.side)
+            if not legal_moves:
+                results.append((None, None))
+                continue
+            self.start_search(time_limit, node_limit)
+            best_move, best_score = self.iterative_deepening(position.side, depth)
+            self.search_seconds = time.perf_counter() - self.search_start
+            results.append((best_move or legal_moves[0], best_score))
+        self.end_search()
+        return results
+
+    def iterative_deepening(self, player, depth):
+        """Search depth 1..depth in this process; return the last completed (move, score)."""
+        best_move, best_score = None, None
+        start_stack = len(self.board.move_stack)
+
+        for current_depth in range(1, depth + 1):
+            self.can_abort = current_depth > 1
+            nodes_before = self.nodes
+            started = time.perf_counter()
+            try:
+                move, score = self.negamax(player, current_depth, float('-inf'), float('inf'),
+                                           first_move=best_move)
+            except SearchTimeout:
+                # Unwind the moves the interrupted iteration left on the board
+                while len(self.board.move_stack) > start_stack:
+                    self.board.unmake_move()
+                break
+            if move is not None:
+                best_move, best_score = move, score
+                self.principal_variation = self.pv[0] or [move]
+            self.completed_depth = current_depth
+            self.iteration_nodes.append(self.nodes - nodes_before)
+            self.iteration_seconds.append(time.perf_counter() - started)
+
+        return best_move, best_score
+
+    def search_stats(self):
+        """Return node, cutoff and timing counters for the last search.
+
+        The effective branching factor is the ratio of nodes between the last
+        two completed iterations; better move ordering makes it smaller.
+        Phase times are wall-clock seconds in move generation, evaluate and
+        the search's in-check tests; the rest of 'seconds' is search overhead.
+        """
+        stats = {
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'depth': self.completed_depth,
+            'seconds': self.search_seconds,
+            'iteration_nodes': list(self.iteration_nodes),
+            'iteration_seconds': list(self.iteration_seconds),
+            'phase_seconds': dict(self.phase_seconds),
+            'tt_probes': self.tt.probes - self.tt_probes_before,
+            'tt_hits': self.tt.hits - self.tt_hits_before,
+            'pv': list(self.principal_variation),
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'branching_factor': None,
+            'tablebase_hits': self.tablebase_hits,
+        }
+        if len(self.iteration_nodes) >= 2 and self.iteration_nodes[-2]:
+            stats['branching_factor'] = self.iteration_nodes[-1] / self.iteration_nodes[-2]
+        return stats
+
+    def order_moves(self, moves, ply, hash_move):
+        """Sort moves so the ones most likely to cause a cutoff come first."""
+        if not self.use_move_ordering:
+            if hash_move in moves:
+                moves.remove(hash_move)
+                moves.insert(0, hash_move)
+            return moves
+
+        get_piece = self.board.get_piece
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+
+        def move_score(move):
+            if move == hash_move:
+                return HASH_MOVE_SCORE
+            victim = get_piece(move[1])
+            if victim != '.':
+                # Most valuable victim, least valuable attacker
+                return CAPTURE_SCORE + PIECE_VALUES[victim] * 16 - PIECE_VALUES[get_piece(move[0])]
+            if move in killers:
+                return KILLER_SCORE
+            return history.get(move, 0)
+
+        moves.sort(key=move_score, reverse=True)
+        return moves
+
+    def record_cutoff(self, move, ply, depth, move_index):
+        """Update counters, killer moves and history after a beta cutoff."""
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+        if self.board.get_piece(move[1]) != '.':
+            return  # captures are already ordered by MVV-LVA
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def check_budget(self, count):
+        """Raise SearchTimeout if the node or time budget is spent.
+
+        count is the caller's node counter; the clock and stop_event are read
+        every 256 nodes.
+        """
+        if self.can_abort:
+            if self.node_limit and self.nodes + self.qnodes > self.node_limit:
+                raise SearchTimeout()
+            if count & 255 == 0:
+                if self.deadline and time.perf_counter() > self.deadline:
+                    raise SearchTimeout()
+                if self.stop_event is not None and self.stop_event.is_set():
+                    raise SearchTimeout()
+
+    def quiescence(self, player, alpha, beta, ply):
+        """Search captures only until the position is quiet, then evaluate.
+
+        The side to move may "stand pat" on the static score instead of
+        capturing, and captures that cannot lift the score back into the
+        window even after winning the victim (delta pruning) are skipped.
+        Scores are from player's point of view, as in negamax.
+        """
+        enemy = 'black' if player == 'white' else 'white'
+        self.qnodes += 1
+        self.check_budget(self.qnodes)
+        phases = self.phase_seconds
+
+        in_check, mated = self.leaf_check(player)
+        if mated:
+            return -(MATE_SCORE - ply)
+        started = clock()
+        stand_pat = self.evaluate(player, in_check)
+        phases['evaluate'] += clock() - started
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        best_score = stand_pat
+
+        get_piece = self.board.get_piece
+        started = clock()
+        captures = self.board.get_legal_captures(player)
+        phases['movegen'] += clock() - started
+        for from_pos, to_pos in self.order_moves(captures, ply, None):
+            # Delta pruning
+            if stand_pat + PIECE_VALUES[get_piece(to_pos)] * 100 + DELTA_MARGIN < alpha:
+                continue
+
+            self.board.make_move(from_pos, to_pos)
+            score = -self.quiescence(enemy, -beta, -alpha, ply + 1)
+            self.board.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+
+        return best_score
+
+    def negamax(self, player, depth, alpha, beta, ply=0, first_move=None, allow_null=True):
+        """Negamax with alpha-beta pruning and principal variation search.
+
+        Scores are from the point of view of player, the side to move. The
+        first move is searched with the full window and the rest with a null
+        window around alpha, re-searched only if they beat it. Also uses
+        null-move pruning and late-move reductions (see NULL_MOVE_REDUCTION
+        and LMR_MIN_MOVES). first_move, if legal, is searched before anything
+        else (it overrides the hash move). ply is the distance from the root;
+        the best line found is left in self.pv[ply].
+        """
+        while len(self.pv) <= ply:
+            self.pv.append([])
+        self.pv[ply] = []
+
+        # Few pieces left: the tablebase knows the exact result
+        if ply > 0 and self.tablebase is not None and self.board.count_pieces() <= MAX_PIECES:
+            result = self.tablebase.probe(self.board, player)
+            if result is not None:
+                self.tablebase_hits += 1
+                return None, tablebase_score(result, ply)
+
+        if depth <= 0 and self.use_quiescence:
+            return None, self.quiescence(player, alpha, beta, ply)
+
         enemy = 'black' if player == 'white' else 'white'
+        self.nodes += 1
+        self.check_budget(self.nodes)
+
+        phases = self.phase_seconds
 
         # Base case: stop when depth reaches 0 or checkmate
-        if depth == 0 or self.board.is_checkmate(player):
-            return None, self.evaluate(player)
+        if depth <= 0:
+            in_check, mated = self.leaf_check(player)
+            if mated:
+                return None, -(MATE_SCORE - ply)
+            started = clock()
+            score = self.evaluate(player, in_check)
+            phases['evaluate'] += clock() - started
+            return None, score
+
+        # Transposition table lookup, before move generation so a cutoff
+        # costs no more than the probe
+        board = self.board
+        key = board.hash ^ ZOBRIST_BLACK_TO_MOVE if player == 'black' else board.hash
+        entry = self.tt.probe(key)
+        hash_move = None
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move = entry
+            entry_score = score_from_tt(entry_score, ply)
+            if entry_depth >= depth and hash_move is not None and ply > 0:
+                if (bound == EXACT
+                        or (bound == LOWER_BOUND and entry_score >= beta)
+                        or (bound == UPPER_BOUND and entry_score <= alpha)):
+                    self.pv[ply] = [hash_move]
+                    return hash_move, entry_score
+
+        started = clock()
+        legal_moves = board.get_all_legal_moves(player)
+        generated = clock()
+        in_check = board.is_in_check(player)
+        phases['movegen'] += generated - started
+        phases['check'] += clock() - generated
+        if not legal_moves:
+            if not in_check:
+                return None, 0  # stalemate
+            # Checkmate; prefer the quickest mate and the slowest loss
+            return None, -(MATE_SCORE - ply)
 
-        best_score = float('-inf') if maximizing else float('inf')
+        # Null move: let the opponent move twice. If a reduced search still
+        # fails high, a real move would too. Skipped in check and without
+        # pieces, where passing may be the only thing that loses (zugzwang).
+        if (self.use_null_move and allow_null and ply > 0 and depth >= NULL_MOVE_REDUCTION + 1
+                and not in_check and beta != float('inf')
+                and (board.score if player == 'white' else -board.score) >= beta
+                and board.has_non_pawn_material(player)):
+            _, score = self.negamax(enemy, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1,
+                                    ply + 1, allow_null=False)
+            if -score >= beta:
+                return None, beta
+
+        self.order_moves(legal_moves, ply, first_move or hash_move)
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+
+        alpha_orig = alpha
+        best_score = float('-inf')
         best_move = None
 
-        pieces = self.board.get_pieces_with_legal_moves(player)
-
-        for from_pos in pieces:
-            possible_moves = self.board.get_list_of_legal_moves(from_pos)
-            for to_pos in possible_moves:
-                if not self.board.is_move_legal(from_pos, to_pos):  # Extra safety check
-                    print(f"❌ Skipping illegal move: {from_pos} -> {to_pos}")
-                    continue
-
-                # Save board state
-                temp_board = copy.deepcopy(self.board.board)
-
-                # Make the move
-                self.board.move_piece(from_pos, to_pos)
-
-                # Recursively call MinMax
-                _, score = self.minmax(enemy, depth - 1, alpha, beta, not maximizing)
-
-                # Restore the board state
-                self.board.board = temp_board
-
-                # Update best move and score
-                if maximizing:
-                    if score > best_score:
-                        best_score = score
-                        best_move = (from_pos, to_pos)
-                    alpha = max(alpha, best_score)
-                else:
-                    if score < best_score:
-                        best_score = score
-                        best_move = (from_pos, to_pos)
-                    beta = min(beta, best_score)
-
-                # Alpha-beta pruning
-                if beta <= alpha:
-                    break
-            if beta <= alpha:
+        for move_index, move in enumerate(legal_moves):
+            from_pos, to_pos = move
+            # Late-move reduction for quiet moves ordered near the end
+            reduction = 0
+            if (self.use_late_move_reductions and move_index >= LMR_MIN_MOVES and depth >= 3
+                    and not in_check and board.get_piece(to_pos) == '.'
+                    and move not in killers
+                    and not (board.get_piece(from_pos) in 'Pp' and to_pos[0] in (0, 7))):
+                reduction = 1
+
+            board.make_move(from_pos, to_pos)
+            if reduction:
+                started = clock()
+                if board.is_in_check(enemy):
+                    reduction = 0  # keep checks at full depth
+                phases['check'] += clock() - started
+
+            if move_index == 0:
+                score = -self.negamax(enemy, depth - 1, -beta, -alpha, ply + 1)[1]
+            else:
+                score = -self.negamax(enemy, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)[1]
+                if reduction and score > alpha:
+                    score = -self.negamax(enemy, depth - 1, -alpha - 1, -alpha, ply + 1)[1]
+                if alpha < score < beta:
+                    score = -self.negamax(enemy, depth - 1, -beta, -alpha, ply + 1)[1]
+
+            board.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+
+            # Alpha-beta pruning
+            if alpha >= beta:
+                self.record_cutoff(move, ply, depth, move_index)
                 break
 
+        if best_score <= alpha_orig:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, score_to_tt(best_score, ply), bound, best_move)
+
         return best_move, best_score
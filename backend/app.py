@@ -1,13 +1,22 @@
+import atexit
+import os
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, jsonify, request, send_from_directory
 
+from config import (BOARD_BACKEND, AI_MAX_DEPTH, AI_TIME_BUDGET, AI_NODE_BUDGET, AI_WORKERS,
+                    AI_PONDER, AI_THREADS, MAX_GAMES, GAME_IDLE_SECONDS, OPENING_BOOK_PATH,
+                    JOURNAL_DIR, AI_MOVE_MAX_WAIT, SHARED_STORE, LOG_LEVEL, TABLEBASE_DIR,
+                    PROFILE_DIR, MOVE_CACHE_SIZE, MOVE_CACHE_PATH)
+from logs import get_logger, setup_logging, counts as log_counts
+
+setup_logging(LOG_LEVEL)
+logger = get_logger('app')
+
 # Initialize Flask app
 app = Flask(__name__)
 
-turn = 'player'
-game_running = True
-last_ai_move = None
+
 # Serve the main HTML file for the frontend
 @app.route('/')
 def serve_index():
@@ -21,53 +30,105 @@ def serve_static(path):
 # Attempt to import the chess board and AI modules
 try:
     from chess_board import ChessBoard
-    from ai_player import AIPlayer
-    print("[INFO] Board and AI imported successfully!")
+    from bitboard_board import BitboardChessBoard
+    from game_store import GameStore
+    from journal import MoveJournal
+    from metrics import SearchMetrics, merge_snapshots, prometheus_text
+    from move_cache import MoveCache
+    from opening_book import OpeningBook
+    from position import Position
+    from shared_store import SharedGameStore
+    from tablebase import Tablebase
+    logger.info("Board and AI imported successfully!")
 except Exception as e:
-    print(f"[ERROR] Error importing board or AI: {e}")
+    logger.error("Error importing board or AI: %s", e)
+
+# Open the opening book; the file is memory-mapped and shared by all games
+opening_book = None
+if os.path.exists(OPENING_BOOK_PATH):
+    try:
+        opening_book = OpeningBook(OPENING_BOOK_PATH)
+        logger.info("Opening book loaded: %d entries", opening_book.count)
+    except Exception as e:
+        logger.error("Error opening book %s: %s", OPENING_BOOK_PATH, e)
+
+# Map the endgame tablebases, shared by all games like the book
+tablebase = None
+if os.path.isdir(TABLEBASE_DIR):
+    try:
+        tablebase = Tablebase(TABLEBASE_DIR)
+        logger.info("Endgame tablebases loaded: %s", ', '.join(
+            f"K{piece}K" for piece in tablebase.tables) or 'none')
+    except Exception as e:
+        logger.error("Error opening tablebases in %s: %s", TABLEBASE_DIR, e)
+
+# Cache the AI's moves across games; with a shared store the engines search
+# and keep the cache instead
+move_cache = None
+if MOVE_CACHE_SIZE and not SHARED_STORE:
+    try:
+        move_cache = MoveCache(MOVE_CACHE_SIZE, MOVE_CACHE_PATH or None)
+        logger.info("Move cache of %d entries%s", MOVE_CACHE_SIZE,
+                    f" backed by {MOVE_CACHE_PATH}" if MOVE_CACHE_PATH else '')
+    except Exception as e:
+        logger.error("Error opening move cache %s: %s", MOVE_CACHE_PATH, e)
 
-# Create instances of the chess board and AI player
+# Open the move journal; every move is appended so games survive restarts.
+# A shared store is a database already and needs no journal.
+journal = None
+if JOURNAL_DIR and not SHARED_STORE:
+    try:
+        journal = MoveJournal(JOURNAL_DIR)
+        atexit.register(journal.close)
+        logger.info("Move journal in %s", JOURNAL_DIR)
+    except Exception as e:
+        logger.error("Error opening move journal %s: %s", JOURNAL_DIR, e)
+
+
+def resume_ai_turn(game):
+    """A game rebuilt from its journal may have stopped while the AI was to move."""
+    if game.turn == 'ai':
+        ai_pool.submit(run_ai_turn, game)
+
+
+# Search totals for /stats and /metrics, shared by every game's AI
+search_metrics = SearchMetrics()
+
+# Create the game store and the pool that runs AI searches for every game.
+# With a shared store, engine.py processes run the AI instead.
+ai_pool = None
 try:
-    board = ChessBoard()
-    ai = AIPlayer(board)
-    print("[INFO] Board and AI instances created successfully!")
+    board_class = BitboardChessBoard if BOARD_BACKEND == 'bitboard' else ChessBoard
+    if SHARED_STORE:
+        games = SharedGameStore(SHARED_STORE, board_class,
+                                max_games=MAX_GAMES, idle_seconds=GAME_IDLE_SECONDS)
+    else:
+        games = GameStore(board_class,
+                          ai_options={'workers': AI_WORKERS, 'opening_book': opening_book,
+                                      'tablebase': tablebase, 'metrics': search_metrics,
+                                      'move_cache': move_cache},
+                          max_games=MAX_GAMES, idle_seconds=GAME_IDLE_SECONDS,
+                          ponder=AI_PONDER, journal=journal, on_resume=resume_ai_turn)
+        ai_pool = ThreadPoolExecutor(max_workers=AI_THREADS, thread_name_prefix='ai')
+    logger.info("Game store created successfully!")
 except Exception as e:
-    print(f"[ERROR] Error creating board or AI instances: {e}")
-
-
-
-
-def main_game_loop():
-    global turn, game_running, last_ai_move
-    while game_running:
-        # Check if it is AI's turn
-        if turn == 'ai':
-            print("[GAME LOOP] It's AI's turn. Calculating move...")
-            best_move = ai.get_best_move('black', depth=4)
-            if best_move:
-                from_pos, to_pos = best_move
-                # Validate and execute the move
-                if board.is_move_legal(from_pos, to_pos):
-                    board.move_piece(from_pos, to_pos)
-                    last_ai_move = {'from': from_pos, 'to': to_pos}
-                    print(f"[GAME LOOP] AI moved: {from_pos} -> {to_pos}")
-                else:
-                    print(f"[GAME LOOP ERROR] AI attempted invalid move: {from_pos} -> {to_pos}")
-            else:
-                print("[GAME LOOP] No legal moves available for AI.")
-            # After the AI move, set the turn back to the player.
-            turn = 'player'
-        # Sleep briefly before checking again to avoid CPU overuse.
-        time.sleep(1)
+    logger.error("Error creating game store: %s", e)
+
+# The original single-game endpoints (/state, /move, ...) use this game.
+DEFAULT_GAME_ID = 'default'
 
-@app.route('/get_ai_move', methods=['GET'])
-def get_last_ai_move():
-    global last_ai_move
-    if last_ai_move:
-        move = last_ai_move
-        last_ai_move = None
-        return jsonify({'status': 'success', 'move': move})
-    return jsonify({'status': 'no-move'})
+
+def run_ai_turn(game):
+    """Worker pool task: let the AI answer in one game."""
+    try:
+        logger.debug("Game %s: it's AI's turn. Calculating move...", game.game_id)
+        game.play_ai_turn(AI_MAX_DEPTH, time_limit=AI_TIME_BUDGET, node_limit=AI_NODE_BUDGET)
+    except Exception:
+        logger.exception("AI failed in game %s", game.game_id)
+
+
+def unknown_game(game_id):
+    return jsonify({'status': 'error', 'message': f'Unknown game {game_id}'}), 404
 
 
 # Simple route to confirm Flask is running
@@ -75,75 +136,197 @@ def get_last_ai_move():
 def home():
     return "Flask is working!"
 
-# Endpoint to get the current state of the chess board
-@app.route('/state', methods=['GET'])
-def get_state():
-    try:
-        board_state = board.get_state()  # Get current board state
-        print("[INFO] Board state fetched successfully!")
-        return jsonify({'board': board_state})
-    except Exception as e:
-        print(f"[ERROR] Error fetching board state: {e}")
-        return jsonify({'error': str(e)}), 500
+
+# --- Games ---
+
+@app.route('/games', methods=['POST'])
+def create_game():
+    game = games.create()
+    logger.info("Game %s created (%d active)", game.game_id, len(games))
+    return jsonify({'status': 'success', 'game_id': game.game_id,
+                    'board': game.board.get_state()})
+
+
+@app.route('/games/<game_id>', methods=['GET'])
+def get_game(game_id):
+    game = games.get(game_id)
+    if game is None:
+        return unknown_game(game_id)
+    with game.lock:
+        side = 'white' if game.turn == 'player' else 'black'
+        return jsonify({'status': 'success', 'game_id': game_id,
+                        'board': game.board.get_state(), 'turn': game.turn,
+                        'fen': Position.from_board(game.board, side).to_fen()})
+
+
+@app.route('/games/<game_id>', methods=['DELETE'])
+def delete_game(game_id):
+    if not games.delete(game_id):
+        return unknown_game(game_id)
+    return jsonify({'status': 'success'})
+
 
 # Endpoint to handle a player's move
-@app.route('/move', methods=['POST'])
-def make_move():
-    global turn
+@app.route('/games/<game_id>/move', methods=['POST'])
+def make_game_move(game_id):
+    game = games.get(game_id)
+    if game is None:
+        return unknown_game(game_id)
+    return play_player_move(game)
+
+
+@app.route('/games/<game_id>/ai_move', methods=['GET'])
+def get_game_ai_move(game_id):
+    game = games.get(game_id)
+    if game is None:
+        return unknown_game(game_id)
+    return ai_move_response(game)
+
+
+# Endpoint to reset the board to its starting position
+@app.route('/games/<game_id>/reset', methods=['POST'])
+def reset_game(game_id):
+    game = games.get(game_id)
+    if game is None:
+        return unknown_game(game_id)
+    return reset_response(game)
+
+
+def parse_square_json(value):
+    """A [row, col] pair from a request as a tuple, or None unless both are ints in 0..7."""
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        return None
+    if not all(type(index) is int and 0 <= index < 8 for index in value):
+        return None
+    return tuple(value)
+
+
+def play_player_move(game):
     try:
-        data = request.json
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
         # Expecting coordinates in (row, col) order
-        from_pos = tuple(data['from'])
-        to_pos = tuple(data['to']) 
-        print(f"[INFO] Player move received: {from_pos} -> {to_pos}")
-
-        # Validate the player's move without swapping indices,
-        # since our board now uses (row, col) order consistently.
-        if not board.is_move_legal(from_pos, to_pos):
-            print("[ERROR] Invalid player move attempted")
-            return jsonify({'status': 'error', 'message': 'Invalid move'})
+        from_pos = parse_square_json(data.get('from'))
+        to_pos = parse_square_json(data.get('to'))
+        if from_pos is None or to_pos is None:
+            return jsonify({'status': 'error',
+                            'message': "'from' and 'to' must be [row, col] with 0 <= row, col <= 7"}), 400
+        logger.debug("Player move received in game %s: %s -> %s", game.game_id, from_pos, to_pos)
 
-        # Execute the player's move
-        board.move_piece(from_pos, to_pos)
-        print(f"[INFO] Moving piece: from {from_pos} to {to_pos}")
-        print(f"[INFO] ✅ Board after player move:\n{board.get_state()}")
-        turn = 'ai'
-        # Return the updated board state
+        status = game.player_move(from_pos, to_pos)
+        if status == 'invalid':
+            logger.debug("Invalid player move attempted in game %s", game.game_id)
+            return jsonify({'status': 'error', 'message': 'Invalid move'})
+        if status == 'not-your-turn':
+            return jsonify({'status': 'error', 'message': 'Wait for the AI to move'})
 
-        if board.is_checkmate('black'):
+        board_state = game.board.get_state()
+        if status == 'checkmate':
             return jsonify({'status': 'checkmate',
-                'message': 'Black has been checkmated',
-                'board': board.get_state()})
-            
+                            'message': 'Black has been checkmated',
+                            'board': board_state})
 
-
-        return jsonify({'status': 'success', 
-                        'board': board.get_state(),
+        if ai_pool is not None:
+            ai_pool.submit(run_ai_turn, game)
+        return jsonify({'status': 'success',
+                        'board': board_state,
                         'message': 'Player move complete'})
 
     except Exception as e:
-        print(f"[ERROR] 💥 Error processing move: {e}")
+        logger.exception("Error processing move in game %s", game.game_id)
         return jsonify({'status': 'error',
-                         'message': str(e)}), 500
+                        'message': str(e)}), 500
 
 
-# Endpoint to reset the board to its starting position
-@app.route('/reset', methods=['POST'])
-def reset_board():
+def ai_move_response(game):
+    """Answer with the AI's move; ?wait=<seconds> holds the request until it is ready."""
+    wait = min(request.args.get('wait', 0, type=float), AI_MOVE_MAX_WAIT)
+    move = game.take_ai_move(timeout=wait)
+    if move:
+        return jsonify({'status': 'success', 'move': move})
+    return jsonify({'status': 'no-move', 'turn': game.turn,
+                    'no_legal_moves': game.ai_has_no_moves()})
+
+
+def reset_response(game):
     try:
-        board.setup_default()  # Reset the board
-        print("[INFO] Board reset to default setup")
-        return jsonify({'status': 'success', 'board': board.get_state()})
+        game.reset()
+        logger.info("Game %s reset to default setup", game.game_id)
+        return jsonify({'status': 'success', 'board': game.board.get_state()})
     except Exception as e:
-        print(f"[ERROR] Error resetting board: {e}")
+        logger.error("Error resetting board: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+
+# --- Stats ---
+
+def search_snapshot():
+    """Search totals of this process, or of every engine process with a shared store."""
+    if SHARED_STORE:
+        return merge_snapshots(games.load_engine_stats())
+    return search_metrics.snapshot()
+
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    return jsonify({'status': 'success', 'search': search_snapshot(),
+                    'move_cache': move_cache.stats() if move_cache is not None else None,
+                    'games': len(games), 'logs': log_counts()})
+
+
+# The same numbers in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    text = prometheus_text(search_snapshot(), games=len(games), log_counts=log_counts(),
+                           move_cache=move_cache.stats() if move_cache is not None else None)
+    return text, 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
+# Sample the AI's next search in a game and write a flame graph profile
+@app.route('/games/<game_id>/profile', methods=['POST'])
+def profile_game(game_id):
+    game = games.get(game_id)
+    if game is None:
+        return unknown_game(game_id)
+    if not PROFILE_DIR or SHARED_STORE:
+        return jsonify({'status': 'error',
+                        'message': 'Profiling needs CHESSBOT_PROFILE_DIR and the '
+                                   'single-process server'}), 400
+    path = os.path.join(PROFILE_DIR, f"{game_id}-{int(time.time())}.folded")
+    game.ai.profile_path = path
+    return jsonify({'status': 'success', 'profile': path})
+
+
+# --- Single-game endpoints, kept for older clients ---
+
+@app.route('/get_ai_move', methods=['GET'])
+def get_last_ai_move():
+    return ai_move_response(games.get_or_create(DEFAULT_GAME_ID))
+
+
+# Endpoint to get the current state of the chess board
+@app.route('/state', methods=['GET'])
+def get_state():
+    try:
+        game = games.get_or_create(DEFAULT_GAME_ID)
+        return jsonify({'board': game.board.get_state()})
+    except Exception as e:
+        logger.error("Error fetching board state: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/move', methods=['POST'])
+def make_move():
+    return play_player_move(games.get_or_create(DEFAULT_GAME_ID))
+
+
+@app.route('/reset', methods=['POST'])
+def reset_board():
+    return reset_response(games.get_or_create(DEFAULT_GAME_ID))
+
+
 # Start the Flask server
 if __name__ == '__main__':
-    print("[INFO] Starting main game loop...")
-    game_loop_thread = threading.Thread(target=main_game_loop)
-    game_loop_thread.daemon = True  # Ensures it closes when the main program does
-    game_loop_thread.start()
-
-    print("[INFO] Starting Flask server...")
+    logger.info("Starting Flask server...")
     app.run(debug=True)
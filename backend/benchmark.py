@@ -0,0 +1,425 @@
+# backend/benchmark.py
+# Measure how fast the engine is.
+#
+#   python3 benchmark.py [max_depth]
+#       print the speed reports below
+#   python3 benchmark.py [max_depth] --json results.json [--baseline old.json]
+#       run get_best_move over the search suite, save time, nodes and chosen
+#       move per position as JSON, and optionally fail if throughput dropped
+#       compared to an earlier run
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chess_board import ChessBoard
+from bitboard_board import BitboardChessBoard
+from ai_player import AIPlayer
+from game_store import Game
+from parallel import parallel_root_search
+from perft import PERFT_POSITIONS
+from position import Position
+from journal import MoveJournal
+from tablebase import Tablebase
+
+# Endgames for endgame_speed: (name, side to move, grid)
+ENDGAME_POSITIONS = [
+    ('KRK', 'white', ['........', '...k....', '........', '........',
+                      '........', '........', '.....R..', '....K...']),
+    ('KQ vs KP', 'white', ['........', '...k....', '....p...', '........',
+                           '........', '........', '.....Q..', '....K...']),
+]
+
+
+def search_speed(depth, player='black'):
+    """Search the default position to a fixed depth; return (nodes, qnodes, seconds)."""
+    board = ChessBoard()
+    ai = AIPlayer(board)
+    ai.nodes = 0
+    ai.qnodes = 0
+    start = time.perf_counter()
+    ai.negamax(player, depth, float('-inf'), float('inf'))
+    elapsed = time.perf_counter() - start
+    return ai.nodes, ai.qnodes, elapsed
+
+
+def eval_speed(iterations=2000, use_check_bonus=True):
+    """Evaluate every perft position repeatedly and return evaluations per second."""
+    boards = []
+    for _, _, grid in PERFT_POSITIONS:
+        board = ChessBoard()
+        board.set_state(grid)
+        boards.append(AIPlayer(board, use_check_bonus=use_check_bonus))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for ai in boards:
+            ai.evaluate('white')
+            ai.evaluate('black')
+    elapsed = time.perf_counter() - start
+    return iterations * len(boards) * 2 / elapsed
+
+
+def batch_eval_speed(count=20000):
+    """Score count positions one by one and as a batch; return both in positions/second.
+
+    The one-by-one rate loads each position into a board and reads its
+    score, the way a caller without evaluate_batch would.
+    """
+    positions = [Position.from_grid(grid, player) for _, player, grid in PERFT_POSITIONS]
+    positions = (positions * (count // len(positions) + 1))[:count]
+    ai = AIPlayer(ChessBoard())
+
+    start = time.perf_counter()
+    for position in positions:
+        ai.board.set_state(position.grid())
+        score = ai.board.score if position.side == 'white' else -ai.board.score
+    single = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    ai.evaluate_batch(positions)
+    batch = count / (time.perf_counter() - start)
+    return single, batch
+
+
+def game_speed(moves, depth, keep_table=True):
+    """Play the AI against itself and return black's total thinking time.
+
+    With keep_table=False black's transposition table is cleared before every
+    move, which is how the server behaved before the table was kept per game.
+    """
+    board = ChessBoard()
+    white, black = AIPlayer(board), AIPlayer(board)
+    black_time = 0.0
+    for _ in range(moves):
+        move = white.get_best_move('white', depth)
+        if move is None:
+            break
+        board.make_move(*move)
+
+        if not keep_table:
+            black.tt.clear()
+        start = time.perf_counter()
+        move = black.get_best_move('black', depth)
+        black_time += time.perf_counter() - start
+        if move is None:
+            break
+        board.make_move(*move)
+    return black_time, black.tt.stats()
+
+
+def ordering_effect(depth):
+    """Search each perft position with and without move ordering.
+
+    Returns {position name: (stats without ordering, stats with ordering)}.
+    """
+    results = {}
+    for name, player, grid in PERFT_POSITIONS:
+        runs = []
+        for use_move_ordering in (False, True):
+            board = ChessBoard()
+            board.set_state(grid)
+            ai = AIPlayer(board, use_move_ordering=use_move_ordering)
+            ai.get_best_move(player, depth)
+            runs.append(ai.search_stats())
+        results[name] = tuple(runs)
+    return results
+
+
+def parallel_speed(depth, worker_counts=(1, 2, 4, 8)):
+    """Time a fixed-depth root-split search of the open middlegame per worker count.
+
+    Returns {workers: (seconds, best move)}. Every count goes through the
+    process pool, so the 1-worker time is the baseline for the speedup.
+    """
+    _, player, grid = next(position for position in PERFT_POSITIONS
+                           if position[0] == 'open middlegame')
+    results = {}
+    for workers in worker_counts:
+        board = ChessBoard()
+        board.set_state(grid)
+        ai = AIPlayer(board)
+        parallel_root_search(ai, player, 1, workers)  # start the pool's processes
+        start = time.perf_counter()
+        move, _ = parallel_root_search(ai, player, depth, workers)
+        results[workers] = (time.perf_counter() - start, move)
+    return results
+
+
+def ponder_latency(ponder, moves=5, depth=4, think_time=1.0):
+    """Average seconds the AI takes to answer when the player thinks for think_time.
+
+    White is played by a second AIPlayer at the same depth, so the AI's
+    prediction of the player's move is often right. Returns
+    (seconds per AI move, ponder hits, ponder misses).
+    """
+    game = Game('bench', ChessBoard, ponder=ponder)
+    white = AIPlayer(ChessBoard())
+    total = 0.0
+    for _ in range(moves):
+        start = time.perf_counter()
+        white.board.set_state(game.board.get_state())
+        move = white.get_best_move('white', depth)
+        if move is None:
+            break
+        time.sleep(max(0.0, think_time - (time.perf_counter() - start)))
+        if game.player_move(*move) != 'success':
+            break
+
+        start = time.perf_counter()
+        if game.play_ai_turn(depth) is None:
+            break
+        total += time.perf_counter() - start
+
+    if game.ponder_thread is not None:
+        game.ponder_stop.set()
+        game.ponder_thread.join()
+    return total / moves, game.ponder_hits, game.ponder_misses
+
+
+def journal_speed(moves=400):
+    """Record a game of up to moves plies; return (seconds per record, resume seconds).
+
+    Resume cost is bounded by the snapshot interval, not the game length.
+    """
+    directory = tempfile.mkdtemp()
+    journal = MoveJournal(directory)
+    board = ChessBoard()
+    journal.snapshot('bench', board, 'player')
+    player = 'white'
+    elapsed = 0.0
+    recorded = 0
+    for ply in range(moves):
+        legal_moves = board.get_all_legal_moves(player)
+        if not legal_moves:
+            break
+        move = legal_moves[ply % len(legal_moves)]
+        board.make_move(*move)
+        player = 'black' if player == 'white' else 'white'
+        start = time.perf_counter()
+        journal.record_move('bench', 'ai' if player == 'white' else 'player', *move,
+                            board, 'player' if player == 'white' else 'ai')
+        elapsed += time.perf_counter() - start
+        recorded += 1
+    journal.close()
+
+    start = time.perf_counter()
+    journal = MoveJournal(directory)
+    journal.replay('bench', ChessBoard())
+    resume = time.perf_counter() - start
+    journal.close()
+    shutil.rmtree(directory)
+    return elapsed / recorded, resume
+
+
+def pruning_effect(depth):
+    """Search each perft position with and without null-move pruning and LMR.
+
+    Returns {position name: (stats without, stats with)} at the same depth.
+    """
+    results = {}
+    for name, player, grid in PERFT_POSITIONS:
+        runs = []
+        for selective in (False, True):
+            board = ChessBoard()
+            board.set_state(grid)
+            ai = AIPlayer(board, use_null_move=selective, use_late_move_reductions=selective)
+            ai.get_best_move(player, depth)
+            runs.append(ai.search_stats())
+        results[name] = tuple(runs)
+    return results
+
+
+def endgame_speed(directory, depth):
+    """Search each endgame with and without the tablebases in directory.
+
+    Returns {name: ((seconds, move) without, (seconds, move) with)}.
+    """
+    tablebase = Tablebase(directory)
+    results = {}
+    for name, player, grid in ENDGAME_POSITIONS:
+        runs = []
+        for use_tablebase in (False, True):
+            board = ChessBoard()
+            board.set_state(grid)
+            ai = AIPlayer(board, tablebase=tablebase if use_tablebase else None)
+            start = time.perf_counter()
+            move = ai.get_best_move(player, depth)
+            runs.append((time.perf_counter() - start, move))
+        results[name] = tuple(runs)
+    return results
+
+
+def move_latency(event_driven, moves=4, depth=2):
+    """Average seconds from a player's move to the client seeing the AI's reply.
+
+    event_driven=False replays the old server: a game loop thread checking the
+    turn every second and a client polling for the AI move every second.
+    event_driven=True submits the AI turn to a pool and long-polls for it.
+    """
+    game = Game('bench', ChessBoard)
+    pool = ThreadPoolExecutor(max_workers=1)
+    stop = threading.Event()
+
+    def polling_game_loop():
+        while not stop.is_set():
+            if game.turn == 'ai':
+                game.play_ai_turn(depth)
+            time.sleep(1)
+
+    if not event_driven:
+        threading.Thread(target=polling_game_loop, daemon=True).start()
+
+    total = 0.0
+    for _ in range(moves):
+        # The "player" answers with white's first legal move
+        from_pos, to_pos = game.board.get_all_legal_moves('white')[0]
+        start = time.perf_counter()
+        game.player_move(from_pos, to_pos)
+        if event_driven:
+            pool.submit(game.play_ai_turn, depth)
+            move = game.take_ai_move(timeout=30)
+        else:
+            move = game.take_ai_move()
+            while move is None:
+                time.sleep(1)
+                move = game.take_ai_move()
+        total += time.perf_counter() - start
+        if move is None:
+            break
+    stop.set()
+    pool.shutdown()
+    return total / moves
+
+
+def search_suite(depth, time_limit=None, backend='list'):
+    """Run get_best_move on every perft position; return one record per position."""
+    board_class = BitboardChessBoard if backend == 'bitboard' else ChessBoard
+    records = []
+    for name, player, grid in PERFT_POSITIONS:
+        board = board_class()
+        board.set_state(grid)
+        ai = AIPlayer(board)
+        start = time.perf_counter()
+        move = ai.get_best_move(player, depth, time_limit=time_limit)
+        elapsed = time.perf_counter() - start
+        records.append({
+            'position': name,
+            'backend': backend,
+            'depth': depth,
+            'completed_depth': ai.completed_depth,
+            'seconds': round(elapsed, 4),
+            'nodes': ai.nodes,
+            'qnodes': ai.qnodes,
+            'nodes_per_second': round((ai.nodes + ai.qnodes) / elapsed),
+            'move': [list(square) for square in move] if move else None,
+        })
+    return records
+
+
+def compare_to_baseline(records, baseline, tolerance=0.2):
+    """Print changes against an earlier search_suite run; return the regressions.
+
+    A regression is a position whose nodes/second fell by more than tolerance.
+    """
+    previous = {(record['position'], record['backend']): record for record in baseline}
+    regressions = []
+    for record in records:
+        old = previous.get((record['position'], record['backend']))
+        if old is None:
+            continue
+        ratio = record['nodes_per_second'] / old['nodes_per_second']
+        note = ''
+        if record['move'] != old['move']:
+            note = f", move changed from {old['move']}"
+        print(f"{record['position']} [{record['backend']}]: nodes {old['nodes']} -> "
+              f"{record['nodes']}, nodes/s x{ratio:.2f}{note}")
+        if ratio < 1 - tolerance:
+            regressions.append(record['position'])
+    return regressions
+
+
+def report(max_depth):
+    """Print every speed report for searches up to max_depth."""
+    for depth in range(1, max_depth + 1):
+        nodes, qnodes, elapsed = search_speed(depth)
+        print(f"depth {depth}: {nodes} nodes + {qnodes} quiescence nodes in {elapsed:.3f}s "
+              f"({(nodes + qnodes) / elapsed:.0f} nodes/s)")
+
+    for use_check_bonus in (False, True):
+        print(f"evaluate, check bonus={use_check_bonus}: "
+              f"{eval_speed(use_check_bonus=use_check_bonus):.0f} evals/s")
+
+    single, batch = batch_eval_speed()
+    print(f"static scoring: {single:.0f} positions/s one by one, "
+          f"{batch:.0f} positions/s with evaluate_batch")
+
+    for keep_table in (False, True):
+        black_time, stats = game_speed(6, max_depth, keep_table)
+        print(f"6 black moves at depth {max_depth}, table kept={keep_table}: "
+              f"{black_time:.3f}s, hit rate {stats['hit_rate']:.1%}")
+
+    for name, (plain, ordered) in ordering_effect(max_depth).items():
+        print(f"{name}: nodes {plain['nodes']} -> {ordered['nodes']}, "
+              f"first-move cutoffs {plain['first_move_cutoff_rate']:.0%} -> "
+              f"{ordered['first_move_cutoff_rate']:.0%}")
+
+    for name, (full, selective) in pruning_effect(max_depth).items():
+        print(f"{name}: null move + LMR, nodes {full['nodes'] + full['qnodes']} -> "
+              f"{selective['nodes'] + selective['qnodes']}, pv {selective['pv']}")
+
+    for ponder in (False, True):
+        seconds, hits, misses = ponder_latency(ponder, depth=max_depth)
+        print(f"AI reply, ponder={ponder}: {seconds:.3f}s per move "
+              f"({hits} ponder hits, {misses} misses)")
+
+    if os.path.isdir('tablebases'):
+        for name, ((plain, plain_move), (probed, probed_move)) in endgame_speed(
+                'tablebases', max_depth).items():
+            print(f"{name}: {plain:.3f}s ({plain_move}) -> {probed:.4f}s with tablebases "
+                  f"({probed_move})")
+
+    per_record, resume = journal_speed()
+    print(f"move journal: {per_record * 1e6:.1f}us per recorded move, "
+          f"resume in {resume * 1000:.1f}ms")
+
+    for event_driven in (False, True):
+        print(f"move latency, event driven={event_driven}: "
+              f"{move_latency(event_driven):.3f}s per move")
+
+    timings = parallel_speed(max_depth)
+    for workers, (elapsed, move) in timings.items():
+        print(f"parallel search, {workers} workers: {elapsed:.3f}s "
+              f"(speedup {timings[1][0] / elapsed:.2f}x), move {move}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure engine speed.')
+    parser.add_argument('max_depth', nargs='?', type=int, default=4)
+    parser.add_argument('--json', help='run the search suite and write its results here')
+    parser.add_argument('--baseline', help='earlier --json output to compare against')
+    parser.add_argument('--backend', choices=['list', 'bitboard'], default='list')
+    parser.add_argument('--time-limit', type=float, default=None)
+    args = parser.parse_args()
+
+    if not args.json:
+        report(args.max_depth)
+        sys.exit(0)
+
+    records = search_suite(args.max_depth, args.time_limit, args.backend)
+    with open(args.json, 'w') as f:
+        json.dump(records, f, indent=2)
+    for record in records:
+        print(f"{record['position']}: {record['move']} in {record['seconds']}s, "
+              f"{record['nodes']} nodes + {record['qnodes']} quiescence nodes "
+              f"({record['nodes_per_second']} nodes/s)")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare_to_baseline(records, baseline):
+            sys.exit(1)
@@ -0,0 +1,357 @@
+# backend/bitboard_board.py
+# Bitboard implementation of the ChessBoard interface.
+#
+# Square index is row * 8 + col with row 0 at the top, so bit 0 is the top-left
+# corner. Each of the 12 piece characters owns one 64-bit mask, white/black
+# hold the occupancy per colour and a 64-entry mailbox answers "what is on
+# this square" without scanning the masks. self.hash (Zobrist hash) and
+# self.score (material plus piece-square values, see evaluation.py) are
+# updated as pieces are put and removed. Moves and squares at the public
+# interface stay (row, col) tuples so the class is a drop-in for ChessBoard.
+from chess_board import (DEFAULT_LAYOUT, KNIGHT_OFFSETS, KING_OFFSETS,
+                         ROOK_DIRECTIONS, BISHOP_DIRECTIONS, SLIDER_DIRECTIONS)
+from evaluation import PIECE_SQUARE_VALUES
+from zobrist import PIECE_CHARS, ZOBRIST_PIECE_KEYS
+
+
+def build_offset_attacks(offsets):
+    """Precompute, for every square, the mask of squares reached by the offsets."""
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        mask = 0
+        for row_step, col_step in offsets:
+            to_row, to_col = row + row_step, col + col_step
+            if 0 <= to_row < 8 and 0 <= to_col < 8:
+                mask |= 1 << (to_row * 8 + to_col)
+        table.append(mask)
+    return table
+
+
+def build_rays(direction):
+    """Precompute, for every square, the mask of the open ray in one direction."""
+    row_step, col_step = direction
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        mask = 0
+        to_row, to_col = row + row_step, col + col_step
+        while 0 <= to_row < 8 and 0 <= to_col < 8:
+            mask |= 1 << (to_row * 8 + to_col)
+            to_row += row_step
+            to_col += col_step
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = build_offset_attacks(KNIGHT_OFFSETS)
+KING_ATTACKS = build_offset_attacks(KING_OFFSETS)
+# PAWN_ATTACKS[is_white][square]: squares a pawn of that colour captures on.
+PAWN_ATTACKS = {
+    True: build_offset_attacks(((-1, -1), (-1, 1))),
+    False: build_offset_attacks(((1, -1), (1, 1))),
+}
+RAYS = {direction: build_rays(direction)
+        for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+# Rays heading towards higher square indices find their first blocker at the
+# lowest set bit, the others at the highest.
+POSITIVE_DIRECTIONS = {direction for direction in RAYS
+                       if direction[0] * 8 + direction[1] > 0}
+
+
+def sliding_attacks(square, occupied, directions):
+    """Squares attacked from square along the given rays, stopping at blockers."""
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][square]
+        blockers = ray & occupied
+        if blockers:
+            if direction in POSITIVE_DIRECTIONS:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[direction][blocker]
+        attacks |= ray
+    return attacks
+
+
+def iter_squares(mask):
+    """Yield the index of every set bit in mask, lowest first."""
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+class BitboardChessBoard:
+    def __init__(self):
+        """Initialize the bitboards and set up the default layout."""
+        self.setup_default()
+
+    def setup_default(self):
+        """Set up the board with the standard chess layout."""
+        self.set_state(DEFAULT_LAYOUT)
+
+    def set_state(self, board):
+        """Load an 8x8 grid of piece characters and forget the move history."""
+        self.move_stack = []
+        self.squares = ['.'] * 64
+        self.pieces = dict.fromkeys(PIECE_CHARS, 0)
+        self.white = 0
+        self.black = 0
+        self.hash = 0
+        self.score = 0
+        for row in range(8):
+            for col in range(8):
+                if board[row][col] != '.':
+                    self.put_piece(row * 8 + col, board[row][col])
+
+    def get_state(self):
+        """Return the current board state as the 8x8 grid used by ChessBoard."""
+        return [self.squares[row * 8:row * 8 + 8] for row in range(8)]
+
+    def get_piece(self, square):
+        """Return the piece character on a (row, col) square."""
+        return self.squares[square[0] * 8 + square[1]]
+
+    @property
+    def board(self):
+        """Read-only 8x8 grid view, for code written against ChessBoard.board."""
+        return self.get_state()
+
+    def draw_board(self):
+        """Print the current board state."""
+        for row in self.get_state():
+            print(" ".join(row))
+        print()
+
+    # --- Bitboard bookkeeping ---
+
+    def put_piece(self, square, piece):
+        bit = 1 << square
+        self.squares[square] = piece
+        self.pieces[piece] |= bit
+        self.hash ^= ZOBRIST_PIECE_KEYS[piece][square]
+        self.score += PIECE_SQUARE_VALUES[piece][square]
+        if piece.isupper():
+            self.white |= bit
+        else:
+            self.black |= bit
+
+    def remove_piece(self, square):
+        bit = 1 << square
+        piece = self.squares[square]
+        self.squares[square] = '.'
+        self.pieces[piece] ^= bit
+        self.hash ^= ZOBRIST_PIECE_KEYS[piece][square]
+        self.score -= PIECE_SQUARE_VALUES[piece][square]
+        if piece.isupper():
+            self.white ^= bit
+        else:
+            self.black ^= bit
+
+    # --- Making moves ---
+
+    def move_piece(self, from_pos, to_pos):
+        """Move a piece if the move is legal.
+
+        Coordinates in from_pos and to_pos are in (row, col) order.
+        """
+        if self.is_move_legal(from_pos, to_pos):
+            self.make_move(from_pos, to_pos)
+            return True
+        return False
+
+    def make_move(self, from_pos, to_pos):
+        """Play a move without validating it and push an undo record."""
+        from_square = from_pos[0] * 8 + from_pos[1]
+        to_square = to_pos[0] * 8 + to_pos[1]
+        piece = self.squares[from_square]
+        captured = self.squares[to_square]
+
+        if captured != '.':
+            self.remove_piece(to_square)
+        self.remove_piece(from_square)
+
+        # Pawns promote to a queen on the far row
+        promoted = (piece == 'P' and to_square < 8) or (piece == 'p' and to_square >= 56)
+        if promoted:
+            self.put_piece(to_square, 'Q' if piece == 'P' else 'q')
+        else:
+            self.put_piece(to_square, piece)
+
+        self.move_stack.append((from_square, to_square, piece, captured, promoted))
+
+    def unmake_move(self):
+        """Take back the most recent make_move."""
+        from_square, to_square, piece, captured, promoted = self.move_stack.pop()
+        self.remove_piece(to_square)
+        self.put_piece(from_square, piece)
+        if captured != '.':
+            self.put_piece(to_square, captured)
+
+    # --- Move rules ---
+
+    def piece_targets(self, square):
+        """Mask of squares the piece on square can move to, ignoring king safety."""
+        piece = self.squares[square]
+        is_white = piece.isupper()
+        own = self.white if is_white else self.black
+        occupied = self.white | self.black
+        kind = piece.lower()
+
+        if kind == 'p':
+            targets = PAWN_ATTACKS[is_white][square] & (self.black if is_white else self.white)
+            step = -8 if is_white else 8
+            push = square + step
+            if 0 <= push < 64 and not (occupied >> push) & 1:
+                targets |= 1 << push
+                # Move forward two squares from the starting row
+                if square // 8 == (6 if is_white else 1) and not (occupied >> (push + step)) & 1:
+                    targets |= 1 << (push + step)
+            return targets
+        if kind == 't':
+            return KNIGHT_ATTACKS[square] & ~own
+        if kind == 'k':
+            return KING_ATTACKS[square] & ~own
+        return sliding_attacks(square, occupied, SLIDER_DIRECTIONS[kind]) & ~own
+
+    def is_move_legal(self, from_square, to_square):
+        """Determine if a move is legal for the piece at from_square.
+
+        Like ChessBoard, only king moves are filtered for king safety here.
+        """
+        from_index = from_square[0] * 8 + from_square[1]
+        to_index = to_square[0] * 8 + to_square[1]
+        piece = self.squares[from_index]
+        if piece == '.' or from_index == to_index:
+            return False
+        if not (self.piece_targets(from_index) >> to_index) & 1:
+            return False
+        if piece.lower() == 'k':
+            player = 'white' if piece.isupper() else 'black'
+            return not self.does_move_put_player_in_check(player, from_square, to_square)
+        return True
+
+    # --- Check detection ---
+
+    def is_square_attacked(self, square, by_white, occupied):
+        """Check if a non-king piece of the given colour attacks square."""
+        if by_white:
+            pawns, knights = self.pieces['P'], self.pieces['T']
+            diagonal = self.pieces['B'] | self.pieces['Q']
+            straight = self.pieces['R'] | self.pieces['Q']
+        else:
+            pawns, knights = self.pieces['p'], self.pieces['t']
+            diagonal = self.pieces['b'] | self.pieces['q']
+            straight = self.pieces['r'] | self.pieces['q']
+
+        if PAWN_ATTACKS[not by_white][square] & pawns:
+            return True
+        if KNIGHT_ATTACKS[square] & knights:
+            return True
+        if diagonal and sliding_attacks(square, occupied, BISHOP_DIRECTIONS) & diagonal:
+            return True
+        if straight and sliding_attacks(square, occupied, ROOK_DIRECTIONS) & straight:
+            return True
+        return False
+
+    def is_in_check(self, player):
+        """Check if the current player's king is in check."""
+        is_white = player == 'white'
+        king = self.pieces['K' if is_white else 'k']
+        if not king:
+            return False
+        square = king.bit_length() - 1
+        occupied = self.white | self.black
+
+        if self.is_square_attacked(square, not is_white, occupied):
+            return True
+        # ChessBoard counts an adjacent enemy king as giving check only when
+        # it could capture without landing on a defended square.
+        enemy_king = self.pieces['k' if is_white else 'K']
+        if enemy_king & KING_ATTACKS[square]:
+            return not self.is_square_attacked(square, is_white, occupied ^ enemy_king)
+        return False
+
+    def is_checkmate(self, player):
+        """Check if the current player is in checkmate."""
+        return self.is_in_check(player) and not self.has_legal_move(player)
+
+    def does_move_put_player_in_check(self, player, from_square, to_square):
+        """Play the move, test whether it leaves the player in check, and take it back."""
+        self.make_move(from_square, to_square)
+        in_check = self.is_in_check(player)
+        self.unmake_move()
+        return in_check
+
+    # --- Move generation ---
+
+    def generate_pseudo_legal_moves(self, player):
+        """Get every (from, to) move for player, ignoring king safety."""
+        moves = []
+        for from_index in iter_squares(self.white if player == 'white' else self.black):
+            from_square = divmod(from_index, 8)
+            for to_index in iter_squares(self.piece_targets(from_index)):
+                moves.append((from_square, divmod(to_index, 8)))
+        return moves
+
+    def get_all_legal_moves(self, player):
+        """Get every legal (from, to) move for player."""
+        return [(from_square, to_square)
+                for from_square, to_square in self.generate_pseudo_legal_moves(player)
+                if not self.does_move_put_player_in_check(player, from_square, to_square)]
+
+    def get_legal_captures(self, player):
+        """Get every legal (from, to) move for player that captures a piece."""
+        is_white = player == 'white'
+        enemy = self.black if is_white else self.white
+        captures = []
+        for from_index in iter_squares(self.white if is_white else self.black):
+            from_square = divmod(from_index, 8)
+            for to_index in iter_squares(self.piece_targets(from_index) & enemy):
+                to_square = divmod(to_index, 8)
+                if not self.does_move_put_player_in_check(player, from_square, to_square):
+                    captures.append((from_square, to_square))
+        return captures
+
+    def count_pieces(self):
+        """Number of pieces of both colors on the board, kings included."""
+        return bin(self.white | self.black).count('1')
+
+    def piece_squares(self):
+        """List (piece, row * 8 + col) for every piece, read off the piece bitboards."""
+        return [(piece, square) for piece, mask in self.pieces.items() if mask
+                for square in iter_squares(mask)]
+
+    def has_non_pawn_material(self, player):
+        """Check whether player has a knight, bishop, rook or queen."""
+        pieces = 'TBRQ' if player == 'white' else 'tbrq'
+        return any(self.pieces[piece] for piece in pieces)
+
+    def has_legal_move(self, player):
+        """Check whether player has at least one legal move, stopping at the first."""
+        for from_square, to_square in self.generate_pseudo_legal_moves(player):
+            if not self.does_move_put_player_in_check(player, from_square, to_square):
+                return True
+        return False
+
+    def get_list_of_legal_moves(self, from_square):
+        """Get a list of legal moves for the piece at from_square."""
+        from_index = from_square[0] * 8 + from_square[1]
+        piece = self.squares[from_index]
+        if piece == '.':
+            return []
+
+        player = 'white' if piece.isupper() else 'black'
+        return [to_square for to_square in
+                (divmod(to_index, 8) for to_index in iter_squares(self.piece_targets(from_index)))
+                if not self.does_move_put_player_in_check(player, from_square, to_square)]
+
+    def get_pieces_with_legal_moves(self, player):
+        """Get a list of pieces (their positions in (row, col)) that have at least one legal move."""
+        legal_pieces = []
+        for from_square, _ in self.get_all_legal_moves(player):
+            if not legal_pieces or legal_pieces[-1] != from_square:
+                legal_pieces.append(from_square)
+        return legal_pieces
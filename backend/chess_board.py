@@ -1,31 +1,143 @@
 # backend/chess_board.py
-import copy
+import logging
+
+from evaluation import PIECE_SQUARE_VALUES, compute_score
+from logs import get_logger
+from zobrist import ZOBRIST_PIECE_KEYS, compute_hash
+
+logger = get_logger(__name__)
+
+# Note: row 0 is the top and row 7 is the bottom.
+DEFAULT_LAYOUT = (
+    ('r', 't', 'b', 'q', 'k', 'b', 't', '.'),  # Row 0: Black major pieces
+    ('p', 'p', 'p', 'p', 'p', 'p', 'p', '.'),  # Row 1: Black pawns
+    ('.', '.', '.', '.', '.', '.', '.', '.'),  # Row 2
+    ('.', '.', '.', '.', '.', '.', '.', 'K'),  # Row 3
+    ('.', '.', '.', '.', '.', '.', '.', '.'),  # Row 4
+    ('.', '.', '.', '.', '.', '.', '.', '.'),  # Row 5
+    ('P', 'P', 'P', 'P', 'P', 'P', 'P', '.'),  # Row 6: White pawns
+    ('R', 'T', 'B', 'Q', 'P', 'B', 'T', 'R'),  # Row 7: White major pieces
+)
+
+# Offset tables used by the move generator, as (row step, col step).
+KNIGHT_OFFSETS = ((2, 1), (1, 2), (-1, 2), (-2, 1),
+                  (-2, -1), (-1, -2), (1, -2), (2, -1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1),
+                (0, 1), (1, -1), (1, 0), (1, 1))
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+SLIDER_DIRECTIONS = {
+    'r': ROOK_DIRECTIONS,
+    'b': BISHOP_DIRECTIONS,
+    'q': ROOK_DIRECTIONS + BISHOP_DIRECTIONS,
+}
+
+
+def build_offset_targets(offsets):
+    """For every square index, the on-board (row, col) squares at the given offsets."""
+    return tuple(tuple((row + row_step, col + col_step) for row_step, col_step in offsets
+                       if 0 <= row + row_step < 8 and 0 <= col + col_step < 8)
+                 for row in range(8) for col in range(8))
+
+
+def build_rays(directions):
+    """For every square index, the squares along each direction, nearest first."""
+    rays = []
+    for row in range(8):
+        for col in range(8):
+            square_rays = []
+            for row_step, col_step in directions:
+                ray = []
+                to_row, to_col = row + row_step, col + col_step
+                while 0 <= to_row < 8 and 0 <= to_col < 8:
+                    ray.append((to_row, to_col))
+                    to_row += row_step
+                    to_col += col_step
+                if ray:
+                    square_rays.append(tuple(ray))
+            rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+# Precomputed targets per square index (row * 8 + col)
+KNIGHT_TARGETS = build_offset_targets(KNIGHT_OFFSETS)
+KING_TARGETS = build_offset_targets(KING_OFFSETS)
+ROOK_RAYS = build_rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = build_rays(BISHOP_DIRECTIONS)
+SLIDER_RAYS = {
+    'r': ROOK_RAYS,
+    'b': BISHOP_RAYS,
+    'q': tuple(straight + diagonal for straight, diagonal in zip(ROOK_RAYS, BISHOP_RAYS)),
+}
+
 
 class ChessBoard:
     def __init__(self):
         """Initialize the board and set up the default layout."""
         self.board = []
         self.setup_default()
-        self.debug_count = 0
 
     def setup_default(self):
         """Set up the board with the standard chess layout."""
-        # Note: row 0 is the top and row 7 is the bottom.
-        self.board = [
-            ['r', 't', 'b', 'q', 'k', 'b', 't', '.'],  # Row 0: Black major pieces
-            ['p', 'p', 'p', 'p', 'p', 'p', 'p', '.'],  # Row 1: Black pawns
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # Row 2
-            ['.', '.', '.', '.', '.', '.', '.', 'K'],  # Row 3
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # Row 4
-            ['.', '.', '.', '.', '.', '.', '.', '.'],  # Row 5
-            ['P', 'P', 'P', 'P', 'P', 'P', 'P', '.'],  # Row 6: White pawns
-            ['R', 'T', 'B', 'Q', 'P', 'B', 'T', 'R']   # Row 7: White major pieces
-        ]
+        # Undo records for make_move/unmake_move, most recent last.
+        self.move_stack = []
+        self.board = [list(row) for row in DEFAULT_LAYOUT]
+        self.hash = compute_hash(self.board)
+        self.score = compute_score(self.board)
+        self.find_kings()
 
     def get_state(self):
         """Return the current board state."""
         return self.board
 
+    def get_piece(self, square):
+        """Return the piece character on a (row, col) square."""
+        return self.board[square[0]][square[1]]
+
+    def set_state(self, board):
+        """Load an 8x8 grid of piece characters and forget the move history."""
+        self.move_stack = []
+        self.board = [list(row) for row in board]
+        self.hash = compute_hash(self.board)
+        self.score = compute_score(self.board)
+        self.find_kings()
+
+    def find_kings(self):
+        """Locate both kings and count the pieces; make_move and unmake_move keep both up to date."""
+        # (row, col) of each king by piece character, None if it is missing
+        self.king_squares = {'K': None, 'k': None}
+        self.piece_count = 0
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] in self.king_squares:
+                    self.king_squares[self.board[row][col]] = (row, col)
+                if self.board[row][col] != '.':
+                    self.piece_count += 1
+
+    def count_pieces(self):
+        """Number of pieces of both colors on the board, kings included."""
+        return self.piece_count
+
+    def piece_squares(self):
+        """List (piece, row * 8 + col) for every piece; meant for nearly empty boards.
+
+        Kings come from king_squares; the scan for the other pieces stops
+        as soon as piece_count says they have all been found.
+        """
+        squares = [(king, square[0] * 8 + square[1])
+                   for king, square in self.king_squares.items() if square is not None]
+        remaining = self.piece_count - len(squares)
+        for row, pieces in enumerate(self.board):
+            if not remaining:
+                break
+            if pieces.count('.') == 8:
+                continue
+            for col, piece in enumerate(pieces):
+                if piece != '.' and piece not in 'Kk':
+                    squares.append((piece, row * 8 + col))
+                    remaining -= 1
+        return squares
+
     def draw_board(self):
         """Print the current board state."""
         for row in self.board:
@@ -42,31 +154,72 @@ class ChessBoard:
         to_row, to_col = to_pos
         piece = self.board[from_row][from_col]
 
-        # Debug message (will print only the first 20 calls)
-        if self.debug_count < 20:
-            print(f"[DEBUG] Moving piece from {from_pos} (board[{from_row}][{from_col}]) "
-                  f"to {to_pos} (board[{to_row}][{to_col}]), piece: {piece}")
-            self.debug_count += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Moving piece from %s (board[%d][%d]) to %s (board[%d][%d]), piece: %s",
+                         from_pos, from_row, from_col, to_pos, to_row, to_col, piece)
 
         if self.is_move_legal(from_pos, to_pos):
-            # Perform the move
-            self.board[to_row][to_col] = piece
-            self.board[from_row][from_col] = '.'
-
-            # Promotion conditions:
-            # White pawn ('P') promotes when reaching row 0 (top)
-            if piece == 'P' and to_row == 0:
-                #print("White pawn promoted!")
-                self.promote_pawn((to_row, to_col), 'Q')
-            # Black pawn ('p') promotes when reaching row 7 (bottom)
-            elif piece == 'p' and to_row == 7:
-                #print("Black pawn promoted!")
-                self.promote_pawn((to_row, to_col), 'q')
-
+            self.make_move(from_pos, to_pos)
             return True
         else:
             return False
 
+    def make_move(self, from_pos, to_pos):
+        """Play a move without validating it and push an undo record.
+
+        The record is (from_pos, to_pos, moved piece, captured piece, promoted,
+        previous hash, previous score) so that unmake_move can restore the
+        board without copying it. self.hash is kept up to date with Zobrist
+        keys and self.score with material plus piece-square values.
+        """
+        from_row, from_col = from_pos
+        to_row, to_col = to_pos
+        piece = self.board[from_row][from_col]
+        captured = self.board[to_row][to_col]
+
+        self.board[to_row][to_col] = piece
+        self.board[from_row][from_col] = '.'
+
+        # Promotion conditions:
+        # White pawn ('P') promotes when reaching row 0 (top)
+        # Black pawn ('p') promotes when reaching row 7 (bottom)
+        promoted = False
+        if piece == 'P' and to_row == 0:
+            self.promote_pawn((to_row, to_col), 'Q')
+            promoted = True
+        elif piece == 'p' and to_row == 7:
+            self.promote_pawn((to_row, to_col), 'q')
+            promoted = True
+
+        from_index = from_row * 8 + from_col
+        to_index = to_row * 8 + to_col
+        placed = self.board[to_row][to_col]
+        self.move_stack.append((from_pos, to_pos, piece, captured, promoted, self.hash, self.score))
+        self.hash ^= (ZOBRIST_PIECE_KEYS[piece][from_index]
+                      ^ ZOBRIST_PIECE_KEYS[captured][to_index]
+                      ^ ZOBRIST_PIECE_KEYS[placed][to_index])
+        self.score += (PIECE_SQUARE_VALUES[placed][to_index]
+                       - PIECE_SQUARE_VALUES[piece][from_index]
+                       - PIECE_SQUARE_VALUES[captured][to_index])
+        if captured != '.':
+            self.piece_count -= 1
+            if captured == 'K' or captured == 'k':
+                self.king_squares[captured] = None
+        if piece == 'K' or piece == 'k':
+            self.king_squares[piece] = to_pos
+
+    def unmake_move(self):
+        """Take back the most recent make_move."""
+        from_pos, to_pos, piece, captured, promoted, self.hash, self.score = self.move_stack.pop()
+        self.board[from_pos[0]][from_pos[1]] = piece
+        self.board[to_pos[0]][to_pos[1]] = captured
+        if piece == 'K' or piece == 'k':
+            self.king_squares[piece] = from_pos
+        if captured != '.':
+            self.piece_count += 1
+            if captured == 'K' or captured == 'k':
+                self.king_squares[captured] = to_pos
+
     def promote_pawn(self, position, promo_piece):
         """Promote a pawn at the given (row, col) position."""
         row, col = position
@@ -167,11 +320,7 @@ class ChessBoard:
         to_row, to_col = to_square
         to_piece = self.board[to_row][to_col]
 
-        knight_moves = [
-            (2, 1), (1, 2), (-1, 2), (-2, 1),
-            (-2, -1), (-1, -2), (1, -2), (2, -1)
-        ]
-        for move in knight_moves:
+        for move in KNIGHT_OFFSETS:
             if (to_row == from_row + move[0]) and (to_col == from_col + move[1]):
                 if to_piece == '.' or (is_white and to_piece.islower()) or (not is_white and to_piece.isupper()):
                     return True
@@ -190,91 +339,188 @@ class ChessBoard:
 
     # --- Helper functions ---
 
-    def is_in_check(self, player):
-        """Check if the current player's king is in check."""
-        king_piece = 'K' if player == 'white' else 'k'
-        king_pos = None
+    def is_square_attacked(self, square, by_color, include_king=True):
+        """Check if a piece of by_color ('white' or 'black') attacks square.
 
-        # Find the king's position (use (row, col))
-        for row in range(8):
-            for col in range(8):
-                if self.board[row][col] == king_piece:
-                    king_pos = (row, col)
-                    break
-            if king_pos:
-                break
+        Walks outward from square: knight and king targets, the two pawn
+        diagonals and the first piece along each ray, so it costs a few table
+        lookups however many pieces are on the board.
+        """
+        board = self.board
+        row, col = square
+        index = row * 8 + col
+        if by_color == 'white':
+            pawn, knight, bishop, rook, queen, king = 'PTBRQK'
+            pawn_row = row + 1  # white pawns capture towards row 0
+        else:
+            pawn, knight, bishop, rook, queen, king = 'ptbrqk'
+            pawn_row = row - 1
 
+        if 0 <= pawn_row < 8:
+            if col > 0 and board[pawn_row][col - 1] == pawn:
+                return True
+            if col < 7 and board[pawn_row][col + 1] == pawn:
+                return True
+        for target_row, target_col in KNIGHT_TARGETS[index]:
+            if board[target_row][target_col] == knight:
+                return True
+        for rays, slider in ((ROOK_RAYS, rook), (BISHOP_RAYS, bishop)):
+            for ray in rays[index]:
+                for target_row, target_col in ray:
+                    piece = board[target_row][target_col]
+                    if piece != '.':
+                        if piece == slider or piece == queen:
+                            return True
+                        break
+        if include_king:
+            for target_row, target_col in KING_TARGETS[index]:
+                if board[target_row][target_col] == king:
+                    return True
+        return False
+
+    def is_in_check(self, player):
+        """Check if the current player's king is in check."""
+        is_white = player == 'white'
+        king_pos = self.king_squares['K' if is_white else 'k']
         if not king_pos:
             return False
 
-        # Check if any opposing piece can attack the king
-        enemy_is_white = (player == 'black')
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if (enemy_is_white and piece.isupper()) or (not enemy_is_white and piece.islower()):
-                    if self.is_move_legal((row, col), king_pos):
-                        return True
+        enemy = 'black' if is_white else 'white'
+        if self.is_square_attacked(king_pos, enemy, include_king=False):
+            return True
+        # An adjacent enemy king only gives check if it could capture
+        # without landing on a square defended by player's other pieces.
+        enemy_king = self.king_squares['k' if is_white else 'K']
+        if (enemy_king and abs(enemy_king[0] - king_pos[0]) <= 1
+                and abs(enemy_king[1] - king_pos[1]) <= 1):
+            row, col = enemy_king
+            self.board[row][col] = '.'
+            defended = self.is_square_attacked(king_pos, player, include_king=False)
+            self.board[row][col] = 'k' if is_white else 'K'
+            return not defended
         return False
 
     def is_checkmate(self, player):
         """Check if the current player is in checkmate."""
         if self.is_in_check(player):
-            if not self.get_pieces_with_legal_moves(player):
+            if not self.has_legal_move(player):
                 return True
         return False
 
     def does_move_put_player_in_check(self, player, from_square, to_square):
-        """Simulate a move on a copy of the board to check if it leaves the player in check."""
-        board_copy = copy.deepcopy(self)
-        from_row, from_col = from_square
-        to_row, to_col = to_square
-        
-        board_copy.board[to_row][to_col] = board_copy.board[from_row][from_col]
-        board_copy.board[from_row][from_col] = '.'
-        
-        return board_copy.is_in_check(player)
+        """Play the move, test whether it leaves the player in check, and take it back."""
+        self.make_move(from_square, to_square)
+        in_check = self.is_in_check(player)
+        self.unmake_move()
+        return in_check
 
     # --- Move generation ---
 
+    def generate_piece_moves(self, from_square):
+        """Get the destinations of the piece at from_square, ignoring king safety.
+
+        Sliders walk precomputed rays, knights and kings use target tables and pawns
+        push or capture, so only reachable squares are ever looked at.
+        """
+        board = self.board
+        row, col = from_square
+        piece = board[row][col]
+        if piece == '.':
+            return []
+        is_white = piece.isupper()
+        kind = piece.lower()
+        targets = []
+
+        if kind == 'p':
+            step = -1 if is_white else 1
+            next_row = row + step
+            if 0 <= next_row < 8:
+                if board[next_row][col] == '.':
+                    targets.append((next_row, col))
+                    # Move forward two squares from the starting row
+                    if row == (6 if is_white else 1) and board[next_row + step][col] == '.':
+                        targets.append((next_row + step, col))
+                for next_col in (col - 1, col + 1):
+                    if 0 <= next_col < 8:
+                        target = board[next_row][next_col]
+                        if target != '.' and target.isupper() != is_white:
+                            targets.append((next_row, next_col))
+        elif kind == 't' or kind == 'k':
+            for to_row, to_col in (KNIGHT_TARGETS if kind == 't' else KING_TARGETS)[row * 8 + col]:
+                target = board[to_row][to_col]
+                if target == '.' or target.isupper() != is_white:
+                    targets.append((to_row, to_col))
+        else:
+            for ray in SLIDER_RAYS[kind][row * 8 + col]:
+                for to_row, to_col in ray:
+                    target = board[to_row][to_col]
+                    if target == '.':
+                        targets.append((to_row, to_col))
+                    else:
+                        if target.isupper() != is_white:
+                            targets.append((to_row, to_col))
+                        break
+
+        return targets
+
+    def generate_pseudo_legal_moves(self, player):
+        """Get every (from, to) move for player in one board pass, ignoring king safety."""
+        is_white = player == 'white'
+        moves = []
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece != '.' and piece.isupper() == is_white:
+                    from_square = (row, col)
+                    for to_square in self.generate_piece_moves(from_square):
+                        moves.append((from_square, to_square))
+        return moves
+
+    def get_all_legal_moves(self, player):
+        """Get every legal (from, to) move for player."""
+        return [(from_square, to_square)
+                for from_square, to_square in self.generate_pseudo_legal_moves(player)
+                if not self.does_move_put_player_in_check(player, from_square, to_square)]
+
+    def get_legal_captures(self, player):
+        """Get every legal (from, to) move for player that captures a piece."""
+        board = self.board
+        return [(from_square, to_square)
+                for from_square, to_square in self.generate_pseudo_legal_moves(player)
+                if board[to_square[0]][to_square[1]] != '.'
+                and not self.does_move_put_player_in_check(player, from_square, to_square)]
+
+    def has_non_pawn_material(self, player):
+        """Check whether player has a knight, bishop, rook or queen."""
+        pieces = 'TBRQ' if player == 'white' else 'tbrq'
+        return any(piece in pieces for row in self.board for piece in row)
+
+    def has_legal_move(self, player):
+        """Check whether player has at least one legal move, stopping at the first."""
+        for from_square, to_square in self.generate_pseudo_legal_moves(player):
+            if not self.does_move_put_player_in_check(player, from_square, to_square):
+                return True
+        return False
+
     def get_list_of_legal_moves(self, from_square):
         """Get a list of legal moves for the piece at from_square.
            Coordinates are in (row, col) order.
         """
-        legal_moves = []
         from_row, from_col = from_square
         piece = self.board[from_row][from_col]
-
-        if piece.isupper():
-            player = 'white'
-        else:
-            player = 'black'
-            
         if piece == '.':
             return []
 
-        for row in range(8):
-            for col in range(8):
-                to_square = (row, col)
-                if self.is_move_legal(from_square, to_square) and not self.does_move_put_player_in_check(player, from_square, to_square):
-                    legal_moves.append(to_square)
-
-        return legal_moves
+        player = 'white' if piece.isupper() else 'black'
+        return [to_square for to_square in self.generate_piece_moves(from_square)
+                if not self.does_move_put_player_in_check(player, from_square, to_square)]
 
     def get_pieces_with_legal_moves(self, player):
         """Get a list of pieces (their positions in (row, col)) that have at least one legal move."""
         legal_pieces = []
-
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                pos = (row, col)
-                if player == 'white':
-                    if piece.isupper() and self.get_list_of_legal_moves(pos):
-                        legal_pieces.append(pos)
-                elif player == 'black':
-                    if piece.islower() and self.get_list_of_legal_moves(pos):
-                        legal_pieces.append(pos)
+        for from_square, _ in self.get_all_legal_moves(player):
+            if not legal_pieces or legal_pieces[-1] != from_square:
+                legal_pieces.append(from_square)
         return legal_pieces
 
     def is_clear_path(self, from_square, to_square):
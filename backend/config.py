@@ -0,0 +1,45 @@
+# backend/config.py
+# Server settings from CHESSBOT_* environment variables, shared by app.py
+# and engine.py.
+import os
+
+# Board implementation: 'list' (ChessBoard) or 'bitboard' (BitboardChessBoard)
+BOARD_BACKEND = os.environ.get('CHESSBOT_BOARD_BACKEND', 'list')
+# AI search limits per move: maximum depth, wall-clock seconds and
+# (optionally) nodes. The AI answers with its deepest finished search.
+AI_MAX_DEPTH = int(os.environ.get('CHESSBOT_AI_MAX_DEPTH', '4'))
+AI_TIME_BUDGET = float(os.environ.get('CHESSBOT_AI_TIME_BUDGET', '3.0'))
+AI_NODE_BUDGET = int(os.environ.get('CHESSBOT_AI_NODE_BUDGET', '0')) or None
+# Worker processes for each AI search; 1 searches in the AI thread itself.
+AI_WORKERS = int(os.environ.get('CHESSBOT_AI_WORKERS', '1'))
+# Keep searching the predicted reply while the player thinks
+AI_PONDER = os.environ.get('CHESSBOT_AI_PONDER', '1') != '0'
+# Threads running AI searches, shared by all games
+AI_THREADS = int(os.environ.get('CHESSBOT_AI_THREADS', '4'))
+# Games kept in memory, and seconds before an untouched game is dropped
+MAX_GAMES = int(os.environ.get('CHESSBOT_MAX_GAMES', '1000'))
+GAME_IDLE_SECONDS = float(os.environ.get('CHESSBOT_GAME_IDLE_SECONDS', '3600'))
+# Opening book built by opening_book.py; used if the file exists
+OPENING_BOOK_PATH = os.environ.get('CHESSBOT_OPENING_BOOK', 'openings.bin')
+# Directory of endgame tablebases built by tablebase.py; used if it exists
+TABLEBASE_DIR = os.environ.get('CHESSBOT_TABLEBASES', 'tablebases')
+# Best moves of positions already searched, shared by every game: entries
+# kept in memory (0 turns the cache off) and an optional SQLite file that
+# keeps them across restarts and shares them between engine processes
+MOVE_CACHE_SIZE = int(os.environ.get('CHESSBOT_MOVE_CACHE_SIZE', '100000'))
+MOVE_CACHE_PATH = os.environ.get('CHESSBOT_MOVE_CACHE', '')
+# Directory of per-game move journals used to resume games after a restart;
+# empty to keep games in memory only
+JOURNAL_DIR = os.environ.get('CHESSBOT_JOURNAL_DIR', 'games')
+# Longest time an AI move request waits for the AI before answering 'no-move'
+AI_MOVE_MAX_WAIT = float(os.environ.get('CHESSBOT_AI_MOVE_MAX_WAIT', '30'))
+# SQLite file holding every game so that several web worker processes
+# (wsgi.py) and engine processes (engine.py) can share them; empty keeps
+# games in this process
+SHARED_STORE = os.environ.get('CHESSBOT_SHARED_STORE', '')
+# Directory for search profiles requested through /games/<id>/profile;
+# empty turns profiling off
+PROFILE_DIR = os.environ.get('CHESSBOT_PROFILE_DIR', '')
+# Lowest level of log record written (DEBUG, INFO, WARNING, ERROR); DEBUG
+# adds per-move and search details
+LOG_LEVEL = os.environ.get('CHESSBOT_LOG_LEVEL', 'INFO').upper()
@@ -0,0 +1,86 @@
+# backend/engine.py
+# Engine pool for the production server: processes that take AI turns from
+# the shared game store (see shared_store.py), search and store the reply.
+#
+#   python3 engine.py [--processes N]
+#
+# Uses the same CHESSBOT_* settings as the web server; CHESSBOT_SHARED_STORE
+# must point at the same database file.
+import argparse
+import multiprocessing
+import os
+import time
+
+from config import (BOARD_BACKEND, AI_MAX_DEPTH, AI_TIME_BUDGET, AI_NODE_BUDGET,
+                    OPENING_BOOK_PATH, SHARED_STORE, LOG_LEVEL, TABLEBASE_DIR, MOVE_CACHE_SIZE,
+                    MOVE_CACHE_PATH)
+from ai_player import AIPlayer
+from bitboard_board import BitboardChessBoard
+from chess_board import ChessBoard
+from logs import get_logger, setup_logging
+from metrics import SearchMetrics
+from move_cache import MoveCache
+from opening_book import OpeningBook
+from shared_store import SharedGameStore
+from tablebase import Tablebase
+
+logger = get_logger('engine')
+
+# Seconds an idle engine waits before looking for AI turns again
+IDLE_SLEEP = 0.02
+
+
+def run_engine(path, poll_limit=None):
+    """Engine process: claim AI turns and answer them, forever.
+
+    poll_limit (for tests) stops after that many empty polls in a row.
+    """
+    setup_logging(LOG_LEVEL)
+    board_class = BitboardChessBoard if BOARD_BACKEND == 'bitboard' else ChessBoard
+    store = SharedGameStore(path, board_class)
+    opening_book = OpeningBook(OPENING_BOOK_PATH) if os.path.exists(OPENING_BOOK_PATH) else None
+    tablebase = Tablebase(TABLEBASE_DIR) if os.path.isdir(TABLEBASE_DIR) else None
+    # With CHESSBOT_MOVE_CACHE set, every engine reads and fills the same file
+    move_cache = MoveCache(MOVE_CACHE_SIZE, MOVE_CACHE_PATH or None) if MOVE_CACHE_SIZE else None
+    # One AI per process; its transposition table is shared by every game it plays
+    metrics = SearchMetrics()
+    ai = AIPlayer(board_class(), opening_book=opening_book, tablebase=tablebase, metrics=metrics,
+                  move_cache=move_cache)
+    # A claim outlives the search even if the clock check comes late
+    lease = (AI_TIME_BUDGET or 60) * 2 + 10
+    empty_polls = 0
+
+    logger.info("Engine %d serving AI turns from %s", os.getpid(), path)
+    while poll_limit is None or empty_polls < poll_limit:
+        job = store.claim_ai_turn(lease)
+        if job is None:
+            empty_polls += 1
+            time.sleep(IDLE_SLEEP)
+            continue
+        empty_polls = 0
+        game_id, grid, generation = job
+        try:
+            ai.board.set_state(grid)
+            move = ai.get_best_move('black', depth=AI_MAX_DEPTH, time_limit=AI_TIME_BUDGET,
+                                    node_limit=AI_NODE_BUDGET)
+        except Exception:
+            logger.exception("AI failed in game %s", game_id)
+            move = None
+        if store.finish_ai_turn(game_id, generation, move) and move:
+            logger.debug("Game %s: AI moved: %s -> %s", game_id, move[0], move[1])
+        store.save_engine_stats(os.getpid(), metrics.snapshot())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run AI searches for the production server.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not SHARED_STORE:
+        parser.error('set CHESSBOT_SHARED_STORE to the database the web workers use')
+    processes = [multiprocessing.Process(target=run_engine, args=(SHARED_STORE,))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
@@ -0,0 +1,136 @@
+# backend/evaluation.py
+# Static evaluation tables shared by the boards and the AI.
+#
+# Boards keep a running score (white minus black, in centipawns) by adding
+# PIECE_SQUARE_VALUES[piece][square] for every piece on the board, with
+# square = row * 8 + col. That makes a leaf evaluation a single lookup.
+
+try:
+    import numpy
+except ImportError:  # optional; score_batch falls back to plain Python
+    numpy = None
+
+# Piece values for evaluation, in pawns
+PIECE_VALUES = {
+    'p': 1, 't': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 1000,  # Black pieces
+    'P': 1, 'T': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 1000   # White pieces
+}
+
+# Bonus for giving check, and the score of a checkmate (in centipawns)
+CHECK_BONUS = 500
+MATE_SCORE = 1000000
+# Quiescence search skips captures that leave the score this far below alpha
+# even after winning the captured piece
+DELTA_MARGIN = 200
+
+# Positional bonuses from white's point of view, row 0 at the top (the row
+# white pawns promote on). Black uses the same tables mirrored vertically.
+PIECE_SQUARE_TABLES = {
+    'p': (
+        (0, 0, 0, 0, 0, 0, 0, 0),
+        (50, 50, 50, 50, 50, 50, 50, 50),
+        (10, 10, 20, 30, 30, 20, 10, 10),
+        (5, 5, 10, 25, 25, 10, 5, 5),
+        (0, 0, 0, 20, 20, 0, 0, 0),
+        (5, -5, -10, 0, 0, -10, -5, 5),
+        (5, 10, 10, -20, -20, 10, 10, 5),
+        (0, 0, 0, 0, 0, 0, 0, 0),
+    ),
+    't': (
+        (-50, -40, -30, -30, -30, -30, -40, -50),
+        (-40, -20, 0, 0, 0, 0, -20, -40),
+        (-30, 0, 10, 15, 15, 10, 0, -30),
+        (-30, 5, 15, 20, 20, 15, 5, -30),
+        (-30, 0, 15, 20, 20, 15, 0, -30),
+        (-30, 5, 10, 15, 15, 10, 5, -30),
+        (-40, -20, 0, 5, 5, 0, -20, -40),
+        (-50, -40, -30, -30, -30, -30, -40, -50),
+    ),
+    'b': (
+        (-20, -10, -10, -10, -10, -10, -10, -20),
+        (-10, 0, 0, 0, 0, 0, 0, -10),
+        (-10, 0, 5, 10, 10, 5, 0, -10),
+        (-10, 5, 5, 10, 10, 5, 5, -10),
+        (-10, 0, 10, 10, 10, 10, 0, -10),
+        (-10, 10, 10, 10, 10, 10, 10, -10),
+        (-10, 5, 0, 0, 0, 0, 5, -10),
+        (-20, -10, -10, -10, -10, -10, -10, -20),
+    ),
+    'r': (
+        (0, 0, 0, 0, 0, 0, 0, 0),
+        (5, 10, 10, 10, 10, 10, 10, 5),
+        (-5, 0, 0, 0, 0, 0, 0, -5),
+        (-5, 0, 0, 0, 0, 0, 0, -5),
+        (-5, 0, 0, 0, 0, 0, 0, -5),
+        (-5, 0, 0, 0, 0, 0, 0, -5),
+        (-5, 0, 0, 0, 0, 0, 0, -5),
+        (0, 0, 0, 5, 5, 0, 0, 0),
+    ),
+    'q': (
+        (-20, -10, -10, -5, -5, -10, -10, -20),
+        (-10, 0, 0, 0, 0, 0, 0, -10),
+        (-10, 0, 5, 5, 5, 5, 0, -10),
+        (-5, 0, 5, 5, 5, 5, 0, -5),
+        (0, 0, 5, 5, 5, 5, 0, -5),
+        (-10, 5, 5, 5, 5, 5, 0, -10),
+        (-10, 0, 5, 0, 0, 0, 0, -10),
+        (-20, -10, -10, -5, -5, -10, -10, -20),
+    ),
+    'k': (
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-20, -30, -30, -40, -40, -30, -30, -20),
+        (-10, -20, -20, -20, -20, -20, -20, -10),
+        (20, 20, 0, 0, 0, 0, 20, 20),
+        (20, 30, 10, 0, 0, 10, 30, 20),
+    ),
+}
+
+
+def build_piece_square_values():
+    """Combine material and positional bonuses into one signed value per square."""
+    values = {'.': [0] * 64}
+    for kind, table in PIECE_SQUARE_TABLES.items():
+        white, black = kind.upper(), kind
+        values[white] = [PIECE_VALUES[white] * 100 + table[square // 8][square % 8]
+                         for square in range(64)]
+        values[black] = [-(PIECE_VALUES[black] * 100 + table[7 - square // 8][square % 8])
+                         for square in range(64)]
+    return values
+
+
+PIECE_SQUARE_VALUES = build_piece_square_values()
+
+
+def compute_score(board):
+    """Score an 8x8 grid from scratch (white minus black, in centipawns)."""
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            score += PIECE_SQUARE_VALUES[board[row][col]][row * 8 + col]
+    return score
+
+
+# PIECE_SQUARE_VALUES indexed by the piece's byte, for 64-byte piece arrays
+BYTE_SQUARE_VALUES = {ord(piece): values for piece, values in PIECE_SQUARE_VALUES.items()}
+if numpy is not None:
+    SCORE_TABLE = numpy.zeros((256, 64), dtype=numpy.int64)
+    for piece_byte, values in BYTE_SQUARE_VALUES.items():
+        SCORE_TABLE[piece_byte] = values
+    SQUARE_INDEX = numpy.arange(64)
+
+
+def score_batch(squares_list):
+    """Score many 64-byte piece arrays (white minus black, in centipawns).
+
+    With NumPy installed the whole batch is one table gather and a row sum.
+    """
+    if not squares_list:
+        return []
+    if numpy is None:
+        return [sum(BYTE_SQUARE_VALUES[piece][square] for square, piece in enumerate(squares))
+                for squares in squares_list]
+    codes = numpy.frombuffer(b''.join(squares_list), dtype=numpy.uint8).reshape(-1, 64)
+    return SCORE_TABLE[codes, SQUARE_INDEX].sum(axis=1).tolist()
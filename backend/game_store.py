@@ -0,0 +1,346 @@
+# backend/game_store.py
+# Per-game state for the Flask app and a bounded in-memory store of games.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from ai_player import AIPlayer
+from logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class Game:
+    def __init__(self, game_id, board_class, ai_options=None, ponder=False, journal=None):
+        """Create a game with its own board and AI.
+
+        The AI searches a private copy of the board, so the real board can
+        be read (e.g. by /state) while the AI is thinking. With ponder=True
+        the AI keeps searching on the player's time (see start_ponder).
+        Moves and resets are recorded in journal (a MoveJournal), if given.
+        """
+        self.game_id = game_id
+        self.journal = journal
+        self.board = board_class()
+        self.ai = AIPlayer(board_class(), **(ai_options or {}))
+        # Parallel search does not watch stop_event, so it cannot ponder
+        self.ponder = ponder and self.ai.workers == 1
+        self.turn = 'player'
+        self.last_ai_move = None
+        self.last_player_move = None
+        # Set when the AI's last turn found no legal move (mate or stalemate)
+        self.ai_out_of_moves = False
+        # Background search of the AI's reply to the predicted player move.
+        # Only the ponder thread touches self.ai while it runs.
+        self.ponder_thread = None
+        self.ponder_stop = None
+        self.ponder_move = None
+        self.ponder_generation = None
+        self.ponder_result = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        # Bumped on reset so an AI search started before it is thrown away
+        self.generation = 0
+        # Held for a whole AI turn: self.ai and its board serve one search at
+        # a time, even when a reset and a new player move come mid-search
+        self.search_lock = threading.Lock()
+        # Set by reset to stop the AI turn in progress
+        self.search_stop = None
+        self.lock = threading.Lock()
+        # Notified whenever the AI finishes its turn (or the game is reset)
+        self.ai_turn_done = threading.Condition(self.lock)
+        self.last_access = time.monotonic()
+
+    def touch(self):
+        self.last_access = time.monotonic()
+
+    def reset(self):
+        """Reset the board to its starting position."""
+        with self.lock:
+            self.board.setup_default()
+            self.turn = 'player'
+            self.last_ai_move = None
+            self.last_player_move = None
+            self.ai_out_of_moves = False
+            self.generation += 1
+            if self.search_stop is not None:
+                self.search_stop.set()
+            if self.ponder_stop is not None:
+                self.ponder_stop.set()
+            if self.journal is not None:
+                self.journal.snapshot(self.game_id, self.board, self.turn)
+            self.ai_turn_done.notify_all()
+
+    def close(self):
+        """Stop the game for good (it was deleted or evicted).
+
+        Stops its search and pondering, and makes sure a turn still running
+        never writes to the journal: that would recreate the deleted file.
+        """
+        with self.lock:
+            self.journal = None
+            self.generation += 1
+            if self.search_stop is not None:
+                self.search_stop.set()
+            if self.ponder_stop is not None:
+                self.ponder_stop.set()
+
+    def player_move(self, from_pos, to_pos):
+        """Play the player's (white) move.
+
+        Returns 'invalid', 'not-your-turn', 'checkmate' or 'success'. On
+        'success' it is the AI's turn and the caller should run play_ai_turn.
+        """
+        with self.lock:
+            if self.turn != 'player':
+                return 'not-your-turn'
+            if not self.board.is_move_legal(from_pos, to_pos):
+                return 'invalid'
+            self.board.move_piece(from_pos, to_pos)
+            self.last_player_move = (from_pos, to_pos)
+            # An AI move the client never took is stale now
+            self.last_ai_move = None
+            self.ai_out_of_moves = False
+            self.turn = 'ai'
+            if self.journal is not None:
+                self.journal.record_move(self.game_id, 'player', from_pos, to_pos,
+                                         self.board, self.turn)
+            if self.board.is_checkmate('black'):
+                return 'checkmate'
+            return 'success'
+
+    def play_ai_turn(self, depth, time_limit=None, node_limit=None):
+        """Search and play the AI's (black) move; return it as {'from', 'to'} or None.
+
+        If the AI pondered the move the player made, its result is used.
+        A turn started while another is still running (after a reset)
+        waits for it; reset stops the running search early.
+        """
+        with self.search_lock:
+            return self.play_ai_turn_locked(depth, time_limit, node_limit)
+
+    def play_ai_turn_locked(self, depth, time_limit, node_limit):
+        """play_ai_turn with self.search_lock held."""
+        with self.lock:
+            generation = self.generation
+            player_move = self.last_player_move
+            self.search_stop = stop = threading.Event()
+
+        best_move = self.finish_ponder(generation, player_move, time_limit)
+        if best_move is None:
+            with self.lock:
+                if generation != self.generation:
+                    self.search_stop = None
+                    return None  # reset before the search started
+                self.ai.board.set_state(self.board.get_state())
+            self.ai.stop_event = stop
+            try:
+                best_move = self.ai.get_best_move('black', depth=depth,
+                                                  time_limit=time_limit, node_limit=node_limit)
+            finally:
+                self.ai.stop_event = None
+
+        with self.lock:
+            self.search_stop = None
+            if generation != self.generation:
+                return None  # the game was reset while the AI was thinking
+            move = None
+            if best_move:
+                from_pos, to_pos = best_move
+                # Validate and execute the move
+                if self.board.is_move_legal(from_pos, to_pos):
+                    self.board.move_piece(from_pos, to_pos)
+                    move = {'from': from_pos, 'to': to_pos}
+                    self.last_ai_move = move
+                    if self.journal is not None:
+                        self.journal.record_move(self.game_id, 'ai', from_pos, to_pos,
+                                                 self.board, 'player')
+                    logger.debug("Game %s: AI moved: %s -> %s", self.game_id, from_pos, to_pos)
+                else:
+                    logger.error("Game %s: AI attempted invalid move: %s -> %s",
+                                 self.game_id, from_pos, to_pos)
+            else:
+                logger.info("Game %s: no legal moves available for AI", self.game_id)
+                self.ai_out_of_moves = True
+            # After the AI move, set the turn back to the player.
+            self.turn = 'player'
+            self.ai_turn_done.notify_all()
+            if move and self.ponder:
+                self.start_ponder(best_move, depth)
+            return move
+
+    def start_ponder(self, ai_move, depth):
+        """Start searching the AI's reply to the player's most likely move.
+
+        The predicted move is the second move of the AI's principal
+        variation. Called with self.lock held, right after the AI moved.
+        """
+        pv = self.ai.principal_variation
+        if len(pv) < 2 or pv[0] != ai_move:
+            return  # book move or no line to follow
+        predicted = pv[1]
+        if predicted not in self.board.get_all_legal_moves('white'):
+            return
+
+        self.ai.board.set_state(self.board.get_state())
+        self.ai.board.make_move(*predicted)
+        self.ponder_move = predicted
+        self.ponder_generation = self.generation
+        self.ponder_result = None
+        self.ponder_stop = self.ai.stop_event = threading.Event()
+        self.ponder_thread = threading.Thread(target=self.run_ponder, args=(depth,),
+                                              name=f'ponder-{self.game_id}', daemon=True)
+        self.ponder_thread.start()
+
+    def run_ponder(self, depth):
+        """Ponder thread: search until depth is done or ponder_stop is set."""
+        try:
+            self.ponder_result = self.ai.get_best_move('black', depth=depth, ponder=True)
+        except Exception:
+            logger.exception("Game %s: pondering failed", self.game_id)
+
+    def finish_ponder(self, generation, player_move, time_limit):
+        """End pondering before the AI's turn; return the pondered reply or None.
+
+        On a hit (the player made the predicted move) a search that is still
+        running gets time_limit more seconds and its result is used. On a miss
+        the search is stopped; the AI then searches the real position with
+        the transposition table it warmed up.
+        """
+        thread = self.ponder_thread
+        if thread is None:
+            return None
+        hit = player_move == self.ponder_move and generation == self.ponder_generation
+        if hit:
+            self.ponder_hits += 1
+            if thread.is_alive() and time_limit:
+                self.ai.extend_search(time_limit)
+        else:
+            self.ponder_misses += 1
+            self.ponder_stop.set()
+        thread.join()
+
+        self.ponder_thread = self.ponder_stop = self.ponder_move = None
+        self.ai.stop_event = None
+        # Unused if the ponder search ended before it reached start_search
+        self.ai.pending_deadline = None
+        if hit and self.ponder_result is not None:
+            self.ai.report_pondered()
+        self.ai.pondered = None
+        return self.ponder_result if hit else None
+
+    def take_ai_move(self, timeout=0):
+        """Return the AI's last move once, then forget it.
+
+        If the AI is still thinking, wait up to timeout seconds for it to
+        finish. Returns None if there is no move to report.
+        """
+        with self.lock:
+            if timeout:
+                self.ai_turn_done.wait_for(
+                    lambda: self.last_ai_move is not None or self.turn == 'player', timeout)
+            move, self.last_ai_move = self.last_ai_move, None
+            return move
+
+    def ai_has_no_moves(self):
+        """True if the AI's last turn ended because it had no legal move."""
+        with self.lock:
+            return self.ai_out_of_moves
+
+
+class GameStore:
+    def __init__(self, board_class, ai_options=None, max_games=1000, idle_seconds=3600,
+                 ponder=False, journal=None, on_resume=None):
+        """Keep at most max_games games, dropping idle and least recently used ones.
+
+        With a MoveJournal, games dropped from memory (or lost in a restart)
+        are rebuilt from their journal the next time they are asked for,
+        and on_resume(game) is called for each rebuilt game.
+        """
+        self.board_class = board_class
+        self.ai_options = ai_options or {}
+        self.ponder = ponder
+        self.journal = journal
+        self.on_resume = on_resume
+        self.max_games = max_games
+        self.idle_seconds = idle_seconds
+        self.games = OrderedDict()
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.games)
+
+    def new_game(self, game_id):
+        return Game(game_id, self.board_class, self.ai_options, ponder=self.ponder,
+                    journal=self.journal)
+
+    def create(self, game_id=None):
+        """Start a new game and return it."""
+        game = self.new_game(game_id or uuid.uuid4().hex)
+        if self.journal is not None:
+            self.journal.snapshot(game.game_id, game.board, game.turn)
+        with self.lock:
+            self.games[game.game_id] = game
+            self.evict()
+        return game
+
+    def get(self, game_id):
+        """Return the game with this ID (marking it as recently used), or None."""
+        with self.lock:
+            game = self.games.get(game_id)
+            if game is not None:
+                self.games.move_to_end(game_id)
+                game.touch()
+                return game
+        if self.journal is not None and self.journal.exists(game_id):
+            return self.resume(game_id)
+        return None
+
+    def resume(self, game_id):
+        """Rebuild a game from its journal and keep it in memory."""
+        with self.lock:
+            if game_id in self.games:
+                return self.games[game_id]  # resumed by another request meanwhile
+            game = self.new_game(game_id)
+            game.turn = self.journal.replay(game_id, game.board)
+            self.games[game_id] = game
+            self.evict()
+        logger.info("Game %s resumed from its journal", game_id)
+        if self.on_resume is not None:
+            self.on_resume(game)
+        return game
+
+    def get_or_create(self, game_id):
+        return self.get(game_id) or self.create(game_id)
+
+    def delete(self, game_id):
+        """Remove a game; return False if it did not exist."""
+        with self.lock:
+            game = self.games.pop(game_id, None)
+        found = game is not None
+        if found:
+            game.close()
+        if self.journal is not None and (found or self.journal.exists(game_id)):
+            self.journal.delete(game_id)
+            found = True
+        return found
+
+    def evict(self):
+        """Drop idle games, then the least recently used ones over capacity.
+
+        Called with self.lock held.
+        """
+        cutoff = time.monotonic() - self.idle_seconds
+        # Games are in least-recently-used order, so idle ones come first
+        while self.games:
+            game = next(iter(self.games.values()))
+            if game.last_access >= cutoff and len(self.games) <= self.max_games:
+                break
+            game_id, game = self.games.popitem(last=False)
+            # Stop its AI: a resumed copy of the game takes the turn over
+            game.close()
+            self.evicted += 1
+            if self.journal is not None:
+                self.journal.close_game(game_id)
@@ -0,0 +1,205 @@
+# backend/journal.py
+# Append-only move journal, one text file per game, for resuming games
+# after a restart.
+#
+# Each line of <directory>/<game_id>.log is one record:
+#
+#   S <64 piece characters> <turn>   snapshot: the whole board and whose turn
+#   P e2e4                           a player (white) move
+#   A e7e5                           an AI (black) move
+#
+# A game is rebuilt by loading its last snapshot and replaying the moves
+# after it through move_piece. A snapshot is written when a game starts,
+# when it is reset and every SNAPSHOT_INTERVAL moves, so a resume never
+# replays more than that many moves however long the game is.
+#
+# Writes only go to the file's buffer; a background thread flushes and
+# fsyncs every file written to in the last flush_interval seconds, so
+# recording a move adds no disk wait to a request. Files are opened on
+# demand and closed again once idle or when too many are open, so the
+# number of games in memory is not limited by file descriptors.
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from logs import get_logger
+from opening_book import format_square, parse_move
+
+logger = get_logger(__name__)
+
+SNAPSHOT_INTERVAL = 50
+# Journal files kept open at once, and seconds without a write before one
+# is closed
+MAX_OPEN_FILES = 128
+IDLE_CLOSE_SECONDS = 60
+# Game IDs become file names, so only allow a safe alphabet
+GAME_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class MoveJournal:
+    def __init__(self, directory, flush_interval=0.05):
+        """Keep journals in directory (created if needed), synced every flush_interval seconds."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Open files, least recently written first, and when each was written
+        self.files = OrderedDict()
+        self.last_write = {}
+        # Moves since the last snapshot, per open game
+        self.moves_since_snapshot = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self.run_flusher, name='journal-flush', daemon=True)
+        self.flusher.start()
+
+    def path(self, game_id):
+        if not GAME_ID_PATTERN.match(game_id):
+            raise ValueError(f"Game ID not usable as a journal name: {game_id!r}")
+        return os.path.join(self.directory, f"{game_id}.log")
+
+    def exists(self, game_id):
+        return GAME_ID_PATTERN.match(game_id) is not None and os.path.exists(self.path(game_id))
+
+    def append(self, game_id, line):
+        """Buffer one record; called with self.lock held."""
+        f = self.files.get(game_id)
+        if f is None:
+            while len(self.files) >= MAX_OPEN_FILES:
+                self.close_file(next(iter(self.files)))
+            f = self.files[game_id] = open(self.path(game_id), 'a+')
+            # Drop a final record torn by a crash, so that only the last line
+            # of a journal can ever be incomplete
+            if f.tell():
+                f.seek(f.tell() - 1)
+                if f.read(1) != '\n':
+                    f.seek(0)
+                    f.truncate(f.read().rfind('\n') + 1)
+        else:
+            self.files.move_to_end(game_id)
+        f.write(line + '\n')
+        self.last_write[game_id] = time.monotonic()
+        self.dirty.add(game_id)
+
+    def close_file(self, game_id):
+        """Sync and close one open file; called with self.lock held."""
+        f = self.files.pop(game_id)
+        self.last_write.pop(game_id, None)
+        if game_id in self.dirty:
+            f.flush()
+            os.fsync(f.fileno())
+            self.dirty.discard(game_id)
+        f.close()
+
+    def close_idle(self):
+        """Close files not written to for IDLE_CLOSE_SECONDS."""
+        cutoff = time.monotonic() - IDLE_CLOSE_SECONDS
+        with self.lock:
+            for game_id in [game_id for game_id in self.files
+                            if self.last_write.get(game_id, 0) < cutoff]:
+                self.close_file(game_id)
+
+    def snapshot(self, game_id, board, turn):
+        """Record the whole position; replay starts from the latest snapshot."""
+        squares = ''.join(''.join(row) for row in board.get_state())
+        with self.lock:
+            self.append(game_id, f"S {squares} {turn}")
+            self.moves_since_snapshot[game_id] = 0
+
+    def record_move(self, game_id, mover, from_pos, to_pos, board, turn):
+        """Record a move by 'player' or 'ai'; board and turn are the state after it."""
+        tag = 'P' if mover == 'player' else 'A'
+        with self.lock:
+            self.append(game_id, f"{tag} {format_square(from_pos)}{format_square(to_pos)}")
+            moves = self.moves_since_snapshot.get(game_id, 0) + 1
+            self.moves_since_snapshot[game_id] = moves
+        if moves >= SNAPSHOT_INTERVAL:
+            self.snapshot(game_id, board, turn)
+
+    def replay(self, game_id, board):
+        """Rebuild a game on board from its journal and return whose turn it is.
+
+        A last record torn by a crash is skipped. Raises ValueError if the
+        journal has no snapshot, a malformed record before the last line or
+        a move that move_piece rejects.
+        """
+        self.flush(game_id)
+        with open(self.path(game_id)) as f:
+            lines = f.read().splitlines()
+
+        # The latest complete snapshot
+        start = None
+        for index in range(len(lines) - 1, -1, -1):
+            fields = lines[index].split()
+            if (len(fields) == 3 and fields[0] == 'S' and len(fields[1]) == 64
+                    and fields[2] in ('player', 'ai')):
+                start = index
+                break
+        if start is None:
+            raise ValueError(f"Journal for game {game_id} has no snapshot")
+
+        _, squares, turn = lines[start].split()
+        board.set_state([list(squares[row * 8:row * 8 + 8]) for row in range(8)])
+        moves = 0
+        for index in range(start + 1, len(lines)):
+            line = lines[index]
+            try:
+                tag, move = line.split()
+                if tag not in ('P', 'A'):
+                    raise ValueError(f"Unknown record {tag!r}")
+                from_pos, to_pos = parse_move(move)
+            except ValueError:
+                if index == len(lines) - 1:
+                    break  # the last record, torn by a crash
+                raise ValueError(f"Journal for game {game_id} has a malformed record: {line}")
+            if not board.move_piece(from_pos, to_pos):
+                raise ValueError(f"Journal for game {game_id} has an illegal move: {line}")
+            turn = 'ai' if tag == 'P' else 'player'
+            moves += 1
+        with self.lock:
+            self.moves_since_snapshot[game_id] = moves
+        return turn
+
+    def flush(self, game_id=None):
+        """Write buffered records to disk and fsync them (one game, or every dirty one)."""
+        with self.lock:
+            game_ids = [game_id] if game_id is not None else list(self.dirty)
+            for dirty_id in game_ids:
+                f = self.files.get(dirty_id)
+                if f is not None and dirty_id in self.dirty:
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.dirty.discard(dirty_id)
+
+    def close_game(self, game_id):
+        """Sync and close a game's file, e.g. when the game leaves memory."""
+        with self.lock:
+            if game_id in self.files:
+                self.close_file(game_id)
+            self.moves_since_snapshot.pop(game_id, None)
+
+    def delete(self, game_id):
+        """Forget a game and remove its journal."""
+        self.close_game(game_id)
+        if self.exists(game_id):
+            os.remove(self.path(game_id))
+
+    def run_flusher(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+                self.close_idle()
+            except OSError as e:
+                logger.error("Journal flush failed: %s", e)
+
+    def close(self):
+        """Stop the flusher and sync and close every file."""
+        self.stopped.set()
+        self.flush()
+        with self.lock:
+            for f in self.files.values():
+                f.close()
+            self.files.clear()
+            self.last_write.clear()
@@ -0,0 +1,121 @@
+# backend/loadtest.py
+# Simulate many players against a running server and report latency.
+#
+#   python3 loadtest.py [URL] [--players 20] [--moves 10] [--think 0.0]
+#
+# Every simulated player creates a game, then repeatedly plays a random legal
+# white move (POST /games/<id>/move) and waits for the AI's reply
+# (GET /games/<id>/ai_move?wait=...). Reports p50/p99 latency per request
+# type and overall throughput.
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+
+from chess_board import ChessBoard
+
+AI_MOVE_WAIT = 25
+
+
+def request_json(url, data=None):
+    """GET (or POST data as JSON) and return the decoded JSON reply."""
+    body = None if data is None else json.dumps(data).encode()
+    req = urllib.request.Request(url, data=body, method='GET' if data is None else 'POST',
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=AI_MOVE_WAIT + 30) as response:
+        return json.loads(response.read())
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = 0
+        self.moves = 0
+        self.lock = threading.Lock()
+
+    def timed(self, name, url, data=None):
+        """Make a request and record its latency under name; return the reply or None."""
+        start = time.perf_counter()
+        try:
+            reply = request_json(url, data)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+            print(f"[ERROR] {name}: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+        return reply
+
+
+def play(base_url, moves, think, stats, seed):
+    """One simulated player: a game of up to moves white moves."""
+    rng = random.Random(seed)
+    board = ChessBoard()
+    reply = stats.timed('create', f"{base_url}/games", {})
+    if reply is None:
+        return
+    game_url = f"{base_url}/games/{reply['game_id']}"
+
+    for _ in range(moves):
+        board.set_state(reply['board'])
+        legal_moves = board.get_all_legal_moves('white')
+        if not legal_moves:
+            break
+        from_pos, to_pos = rng.choice(legal_moves)
+        time.sleep(think)
+        reply = stats.timed('move', f"{game_url}/move", {'from': from_pos, 'to': to_pos})
+        if reply is None or reply['status'] != 'success':
+            break
+        ai_reply = stats.timed('ai_move', f"{game_url}/ai_move?wait={AI_MOVE_WAIT}")
+        if ai_reply is None or ai_reply['status'] != 'success':
+            break
+        with stats.lock:
+            stats.moves += 1
+        reply = stats.timed('state', game_url)
+        if reply is None:
+            break
+
+    try:
+        urllib.request.urlopen(urllib.request.Request(game_url, method='DELETE'), timeout=30)
+    except Exception:
+        pass
+
+
+def run(base_url, players, moves, think):
+    stats = Stats()
+    threads = [threading.Thread(target=play, args=(base_url, moves, think, stats, seed))
+               for seed in range(players)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test a running ChessBot server.')
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8000')
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--moves', type=int, default=10, help='white moves per player')
+    parser.add_argument('--think', type=float, default=0.0,
+                        help='seconds each player waits before moving')
+    args = parser.parse_args()
+
+    stats, elapsed = run(args.url.rstrip('/'), args.players, args.moves, args.think)
+    requests = sum(len(values) for values in stats.latencies.values())
+    print(f"{args.players} players, {elapsed:.1f}s: {requests} requests "
+          f"({requests / elapsed:.1f}/s), {stats.moves} full moves "
+          f"({stats.moves / elapsed:.2f}/s), {stats.errors} errors")
+    for name, values in stats.latencies.items():
+        print(f"{name:8} n={len(values):5}  p50 {percentile(values, 0.5) * 1000:8.1f}ms  "
+              f"p99 {percentile(values, 0.99) * 1000:8.1f}ms")
@@ -0,0 +1,102 @@
+# backend/logs.py
+# Logging for the server and engine processes.
+#
+# Every module logs through its own logger:
+#
+#   from logs import get_logger
+#   logger = get_logger(__name__)
+#
+# setup_logging() (called by app.py and engine.py) puts a queue between the
+# loggers and stderr: a log call only appends the record to a bounded queue
+# and a background thread does the writing, so a request never waits on the
+# terminal. When the queue is full the record is dropped rather than
+# blocking. The level comes from CHESSBOT_LOG_LEVEL; search and per-move
+# messages are DEBUG, so by default they cost no more than a level check.
+#
+# counts() reports records logged, dropped (queue full) and suppressed
+# (below the level). The counts are per process and, being updated without
+# a lock, approximate when many threads log at once.
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+# Records counted since the process started
+COUNTS = {'logged': 0, 'dropped': 0, 'suppressed': 0}
+
+
+class CountingLogger(logging.Logger):
+    """A Logger that counts the calls its level turns away."""
+
+    def isEnabledFor(self, level):
+        if logging.Logger.isEnabledFor(self, level):
+            return True
+        COUNTS['suppressed'] += 1
+        return False
+
+
+# Loggers created from here on count suppressed records
+logging.setLoggerClass(CountingLogger)
+
+
+def get_logger(name):
+    """The logger for a module; pass __name__."""
+    return logging.getLogger(name)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue records without ever blocking; count those that do not fit."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            COUNTS['logged'] += 1
+        except queue.Full:
+            COUNTS['dropped'] += 1
+
+
+# The writer thread and the process it runs in (a forked child has none)
+listener = None
+listener_pid = None
+
+
+def setup_logging(level='INFO', queue_size=10000, stream=None):
+    """Send every record at level or above through a queue to stream (stderr).
+
+    Safe to call again, e.g. to change the level; in a forked process call
+    it once more so the writer thread runs in that process too.
+    """
+    global listener, listener_pid
+    root = logging.getLogger()
+    root.setLevel(level)
+    if listener is not None and listener_pid == os.getpid():
+        return
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    records = queue.Queue(maxsize=queue_size)
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(logging.Formatter(FORMAT))
+    root.addHandler(DroppingQueueHandler(records))
+    if listener is None:
+        atexit.register(stop_logging)
+    listener = logging.handlers.QueueListener(records, writer)
+    listener_pid = os.getpid()
+    listener.start()
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread."""
+    global listener
+    if listener is not None and listener_pid == os.getpid():
+        listener.stop()
+    listener = None
+
+
+def counts():
+    """Records logged, dropped and suppressed in this process so far."""
+    return dict(COUNTS)
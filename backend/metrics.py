@@ -0,0 +1,149 @@
+# backend/metrics.py
+# Totals over many AI searches, for the /stats and /metrics endpoints.
+#
+# AIPlayer reports every move it chooses, and every move cache lookup, to a
+# SearchMetrics passed in as metrics=. snapshot() is a plain dict
+# (JSON-ready), merge_snapshots() adds up snapshots from several processes
+# and prometheus_text() renders the server's stats in the Prometheus text
+# exposition format.
+import threading
+
+# Upper bounds (seconds) of the search time histogram
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Search phases timed by AIPlayer
+PHASES = ('movegen', 'evaluate', 'check')
+# Counters summed over every search, as named in AIPlayer.search_stats
+SEARCH_TOTALS = ('nodes', 'qnodes', 'seconds', 'tt_probes', 'tt_hits', 'cutoffs',
+                 'first_move_cutoffs', 'tablebase_hits')
+
+
+def empty_snapshot():
+    return {
+        'moves': {'search': 0, 'book': 0, 'tablebase': 0, 'cache': 0},
+        'move_cache': {'hits': 0, 'misses': 0},
+        'totals': dict.fromkeys(SEARCH_TOTALS, 0),
+        'phase_seconds': dict.fromkeys(PHASES, 0.0),
+        'depths': {},
+        'seconds_buckets': [0] * len(SECONDS_BUCKETS),
+        'last': None,
+        'slowest': None,
+    }
+
+
+class SearchMetrics:
+    def __init__(self):
+        """Start with every counter at zero; safe to share between threads."""
+        self.lock = threading.Lock()
+        self.data = empty_snapshot()
+
+    def record(self, source, stats=None):
+        """Count a move chosen by 'search', 'book', 'tablebase' or 'cache'.
+
+        stats is AIPlayer.search_stats() for a search. The last and the
+        slowest search are kept whole, to see why a move took long.
+        """
+        with self.lock:
+            data = self.data
+            data['moves'][source] += 1
+            if stats is None:
+                return
+            for name in SEARCH_TOTALS:
+                data['totals'][name] += stats[name]
+            for phase in PHASES:
+                data['phase_seconds'][phase] += stats['phase_seconds'][phase]
+            depth = str(stats['depth'])
+            data['depths'][depth] = data['depths'].get(depth, 0) + 1
+            for index, bound in enumerate(SECONDS_BUCKETS):
+                if stats['seconds'] <= bound:
+                    data['seconds_buckets'][index] += 1
+            data['last'] = stats
+            if data['slowest'] is None or stats['seconds'] > data['slowest']['seconds']:
+                data['slowest'] = stats
+
+    def record_cache_lookup(self, hit):
+        """Count a MoveCache lookup made before choosing a move."""
+        with self.lock:
+            self.data['move_cache']['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            data = self.data
+            return {
+                'moves': dict(data['moves']),
+                'move_cache': dict(data['move_cache']),
+                'totals': dict(data['totals']),
+                'phase_seconds': dict(data['phase_seconds']),
+                'depths': dict(data['depths']),
+                'seconds_buckets': list(data['seconds_buckets']),
+                'last': data['last'],
+                'slowest': data['slowest'],
+            }
+
+
+def merge_snapshots(snapshots):
+    """Add up snapshots, e.g. from every engine process; keeps the slowest search overall."""
+    merged = empty_snapshot()
+    for snapshot in snapshots:
+        for group in ('moves', 'move_cache', 'totals', 'phase_seconds', 'depths'):
+            # .get: engines that saved stats before a group existed
+            for name, value in snapshot.get(group, {}).items():
+                merged[group][name] = merged[group].get(name, 0) + value
+        merged['seconds_buckets'] = [total + count for total, count in
+                                     zip(merged['seconds_buckets'], snapshot['seconds_buckets'])]
+        slowest = snapshot['slowest']
+        if slowest is not None and (merged['slowest'] is None
+                                    or slowest['seconds'] > merged['slowest']['seconds']):
+            merged['slowest'] = slowest
+        if snapshot['last'] is not None:
+            merged['last'] = snapshot['last']
+    return merged
+
+
+def prometheus_text(search, games=None, log_counts=None, move_cache=None):
+    """Render a search snapshot (plus optional game, log and MoveCache stats) for Prometheus."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP chessbot_{name} {help_text}")
+        lines.append(f"# TYPE chessbot_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"chessbot_{name}{labels} {value}")
+
+    totals = search['totals']
+    metric('ai_moves_total', 'counter', 'AI moves chosen, by source',
+           [(f'{{source="{source}"}}', count) for source, count in search['moves'].items()])
+    metric('search_nodes_total', 'counter', 'Nodes searched',
+           [('{kind="negamax"}', totals['nodes']), ('{kind="quiescence"}', totals['qnodes'])])
+    metric('search_phase_seconds_total', 'counter',
+           'Search time spent generating moves, evaluating and testing for check',
+           [(f'{{phase="{phase}"}}', round(seconds, 6))
+            for phase, seconds in search['phase_seconds'].items()])
+    metric('search_depth_total', 'counter', 'Searches by deepest completed iteration',
+           [(f'{{depth="{depth}"}}', count)
+            for depth, count in sorted(search['depths'].items(), key=lambda item: int(item[0]))])
+    metric('tt_probes_total', 'counter', 'Transposition table probes', [('', totals['tt_probes'])])
+    metric('tt_hits_total', 'counter', 'Transposition table hits', [('', totals['tt_hits'])])
+    metric('search_cutoffs_total', 'counter', 'Beta cutoffs',
+           [('{move="any"}', totals['cutoffs']), ('{move="first"}', totals['first_move_cutoffs'])])
+    metric('tablebase_hits_total', 'counter', 'Positions scored by the endgame tablebases',
+           [('', totals['tablebase_hits'])])
+    metric('move_cache_lookups_total', 'counter', 'Move cache lookups, by result',
+           [(f'{{result="{result}"}}', search['move_cache'][name])
+            for result, name in (('hit', 'hits'), ('miss', 'misses'))])
+
+    buckets = [(f'_bucket{{le="{bound}"}}', count)
+               for bound, count in zip(SECONDS_BUCKETS, search['seconds_buckets'])]
+    buckets.append(('_bucket{le="+Inf"}', search['moves']['search']))
+    buckets.append(('_sum', round(totals['seconds'], 6)))
+    buckets.append(('_count', search['moves']['search']))
+    metric('search_seconds', 'histogram', 'Time per AI search', buckets)
+
+    if games is not None:
+        metric('games', 'gauge', 'Games in the store', [('', games)])
+    if move_cache is not None:
+        metric('move_cache_entries', 'gauge', 'Moves in the in-memory move cache',
+               [('', move_cache['size'])])
+    if log_counts is not None:
+        metric('log_records_total', 'counter', 'Log records by outcome',
+               [(f'{{outcome="{outcome}"}}', count) for outcome, count in log_counts.items()])
+    return '\n'.join(lines) + '\n'
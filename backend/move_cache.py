@@ -0,0 +1,164 @@
+# backend/move_cache.py
+# Best moves of positions already searched, shared by every game.
+#
+# Most games start from the same layout and follow the same few lines, so
+# the AI keeps meeting positions it has searched before. AIPlayer looks the
+# position up here before searching and stores its move after any search
+# that completed the requested depth. Entries are keyed by the position
+# (board hash and side to move) and the search settings (depth and feature
+# switches, see AIPlayer.cache_settings), so a time-limited search that
+# finished is as good as an unlimited one.
+#
+# The most recently used entries are kept in memory, up to capacity. With a
+# path, entries are also written to a SQLite file shared by every process
+# that opens it (web workers and engine.py processes) and kept across
+# restarts; a memory miss then falls back to the file. The file is trimmed
+# to its own capacity, least recently used first.
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from opening_book import position_key
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS moves (
+    key INTEGER NOT NULL,           -- position key as a signed 64-bit integer
+    settings TEXT NOT NULL,
+    move INTEGER NOT NULL,          -- from square * 64 + to square, squares as row * 8 + col
+    last_used REAL NOT NULL,
+    PRIMARY KEY (key, settings)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS moves_by_use ON moves (last_used);
+'''
+
+# Stores between trims of the file
+TRIM_INTERVAL = 256
+
+
+def signed(key):
+    """Zobrist keys are unsigned 64-bit; SQLite integers are signed."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class MoveCache:
+    def __init__(self, capacity=100000, path=None, disk_capacity=None):
+        """Keep up to capacity moves in memory and, with path, up to disk_capacity on disk."""
+        self.capacity = capacity
+        self.path = path
+        self.disk_capacity = disk_capacity or capacity * 10
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stores = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """One connection per thread, as in SharedGameStore."""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.local.db = db
+        return db
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, board, player, settings):
+        """Return the cached (from, to) move for player in this position, or None.
+
+        The move is checked against the board, so a hash collision or a
+        stale file can never produce an illegal move.
+        """
+        key = (position_key(board, player), settings)
+        with self.lock:
+            move = self.entries.get(key)
+            if move is not None:
+                self.entries.move_to_end(key)
+        from_disk = False
+        if move is None and self.path:
+            row = self.connection().execute(
+                'SELECT move FROM moves WHERE key = ? AND settings = ?',
+                (signed(key[0]), settings)).fetchone()
+            if row is not None:
+                from_square, to_square = divmod(row[0], 64)
+                move = (divmod(from_square, 8), divmod(to_square, 8))
+                from_disk = True
+
+        if move is None or not self.is_playable(board, player, move):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+            if from_disk:
+                self.disk_hits += 1
+                self.remember(key, move)
+        if from_disk:
+            self.connection().execute(
+                'UPDATE moves SET last_used = ? WHERE key = ? AND settings = ?',
+                (time.time(), signed(key[0]), settings))
+        return move
+
+    def put(self, board, player, settings, move):
+        """Cache the best move found for player in this position."""
+        key = (position_key(board, player), settings)
+        with self.lock:
+            self.remember(key, move)
+            self.stores += 1
+            trim = self.stores % TRIM_INTERVAL == 0
+        if self.path:
+            (from_row, from_col), (to_row, to_col) = move
+            db = self.connection()
+            db.execute('INSERT OR REPLACE INTO moves (key, settings, move, last_used) '
+                       'VALUES (?, ?, ?, ?)',
+                       (signed(key[0]), settings, (from_row * 8 + from_col) * 64 + to_row * 8 + to_col,
+                        time.time()))
+            if trim:
+                self.trim(db)
+
+    def remember(self, key, move):
+        """Add to the in-memory LRU; called with self.lock held."""
+        self.entries[key] = move
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def trim(self, db):
+        """Drop the least recently used rows over disk_capacity."""
+        row = db.execute('SELECT last_used FROM moves ORDER BY last_used DESC LIMIT 1 OFFSET ?',
+                         (self.disk_capacity,)).fetchone()
+        if row is not None:
+            db.execute('DELETE FROM moves WHERE last_used <= ?', row)
+
+    @staticmethod
+    def is_playable(board, player, move):
+        from_pos, to_pos = move
+        piece = board.get_piece(from_pos)
+        if piece == '.' or piece.isupper() != (player == 'white'):
+            return False
+        if not board.is_move_legal(from_pos, to_pos):
+            return False
+        board.make_move(from_pos, to_pos)
+        in_check = board.is_in_check(player)
+        board.unmake_move()
+        return not in_check
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+            }
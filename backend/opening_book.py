@@ -0,0 +1,153 @@
+# backend/opening_book.py
+# Opening book stored as a sorted binary file and read through mmap.
+#
+# Build a book from a text file of games:
+#
+#   python3 opening_book.py openings.txt openings.bin
+#
+# Each non-empty line of the text file is one game from the default layout,
+# written as coordinate moves ("e2e4 e7e5 g1f3 ..."). Move numbers ("1."),
+# results ("1-0", "*") and "#" comments are ignored. Every position reached
+# before a move is stored with that move; a position/move pair seen in
+# several games gets a higher weight.
+#
+# The binary file is a header followed by fixed-size records sorted by key,
+# so a lookup is a binary search straight over the mapped file. Every
+# process that opens the same file shares one copy in the OS page cache and
+# nothing is read until it is needed.
+import mmap
+import struct
+import sys
+
+from chess_board import ChessBoard
+from zobrist import ZOBRIST_BLACK_TO_MOVE
+
+MAGIC = b'CBOOK001'
+HEADER = struct.Struct('<8sI')
+# key, from square, to square, weight; squares are row * 8 + col
+RECORD = struct.Struct('<QBBH')
+
+COLUMNS = 'abcdefgh'
+RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+
+
+def position_key(board, player):
+    """Book key of a position: the board hash plus the side to move."""
+    return board.hash ^ ZOBRIST_BLACK_TO_MOVE if player == 'black' else board.hash
+
+
+def parse_square(text):
+    """Convert 'e2' to (row, col) with row 0 at the top (rank 8)."""
+    if len(text) != 2 or text[0] not in COLUMNS or text[1] not in '12345678':
+        raise ValueError(f"Bad square: {text!r}")
+    return 8 - int(text[1]), COLUMNS.index(text[0])
+
+
+def format_square(square):
+    row, col = square
+    return f"{COLUMNS[col]}{8 - row}"
+
+
+def parse_move(text):
+    """Convert 'e2e4' to ((row, col), (row, col))."""
+    return parse_square(text[:2]), parse_square(text[2:4])
+
+
+def read_games(lines):
+    """Yield the move list of every game in a text book."""
+    for line in lines:
+        line = line.split('#', 1)[0]
+        moves = [token for token in line.split()
+                 if token not in RESULTS and not token.endswith('.')]
+        if moves:
+            yield [parse_move(token) for token in moves]
+
+
+def build_book(lines, path):
+    """Replay every game, collect (key, move) weights and write the binary book.
+
+    Returns the number of records written. Raises ValueError on an illegal move.
+    """
+    weights = {}
+    board = ChessBoard()
+    for game_number, moves in enumerate(read_games(lines), start=1):
+        board.setup_default()
+        player = 'white'
+        for from_pos, to_pos in moves:
+            if (from_pos, to_pos) not in board.get_all_legal_moves(player):
+                raise ValueError(f"Game {game_number}: illegal move "
+                                 f"{format_square(from_pos)}{format_square(to_pos)}")
+            entry = (position_key(board, player),
+                     from_pos[0] * 8 + from_pos[1], to_pos[0] * 8 + to_pos[1])
+            weights[entry] = weights.get(entry, 0) + 1
+            board.make_move(from_pos, to_pos)
+            player = 'black' if player == 'white' else 'white'
+
+    records = sorted(weights.items(), key=lambda item: (item[0][0], -item[1]))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        for (key, from_square, to_square), weight in records:
+            f.write(RECORD.pack(key, from_square, to_square, min(weight, 0xFFFF)))
+    return len(records)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        """Map a book file built by build_book."""
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        self.hits = 0
+        self.misses = 0
+
+    def record_key(self, index):
+        return struct.unpack_from('<Q', self.data, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, key):
+        """Return [(move, weight)] for a position key, highest weight first."""
+        # Binary search for the first record with this key
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        moves = []
+        index = low
+        while index < self.count:
+            record_key, from_square, to_square, weight = RECORD.unpack_from(
+                self.data, HEADER.size + index * RECORD.size)
+            if record_key != key:
+                break
+            moves.append(((divmod(from_square, 8), divmod(to_square, 8)), weight))
+            index += 1
+        return moves
+
+    def best_move(self, board, player):
+        """Return the most played legal book move for this position, or None."""
+        legal_moves = None
+        for move, _ in self.lookup(position_key(board, player)):
+            if legal_moves is None:
+                legal_moves = board.get_all_legal_moves(player)
+            # Guard against hash collisions
+            if move in legal_moves:
+                self.hits += 1
+                return move
+        self.misses += 1
+        return None
+
+    def close(self):
+        self.data.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("usage: python3 opening_book.py GAMES.txt BOOK.bin")
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        count = build_book(f, sys.argv[2])
+    print(f"Wrote {count} book entries to {sys.argv[2]}")
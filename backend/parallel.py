@@ -0,0 +1,170 @@
+# backend/parallel.py
+# Root-splitting parallel search for AIPlayer.
+#
+# Every legal root move is searched in its own task on a ProcessPoolExecutor
+# with a fresh transposition table. The first move (the best of the previous
+# depth) is searched alone with a full window; the others then only need to
+# show whether they beat its score, a window that cuts most of the tree.
+# Each task's result depends only on its move and that score, so the chosen
+# move does not depend on how tasks were spread over workers. Boards travel
+# to workers as a 64-char string, and the time budget as one wall-clock
+# deadline shared by every task, so tasks still queued or running when it
+# passes stop on time.
+import concurrent.futures
+import time
+
+from ai_player import AIPlayer, SearchTimeout
+from bitboard_board import BitboardChessBoard
+from chess_board import ChessBoard
+from tablebase import Tablebase
+
+BOARD_CLASSES = {'list': ChessBoard, 'bitboard': BitboardChessBoard}
+
+# One pool per worker count, shared by every AIPlayer in the process
+executors = {}
+
+# Per worker process: AIPlayer instances reused between tasks, keyed by
+# (backend, options)
+worker_players = {}
+
+
+def get_executor(workers):
+    """Return the shared process pool with the given number of workers."""
+    if workers not in executors:
+        executors[workers] = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    return executors[workers]
+
+
+def serialize_board(board):
+    """Pack a board's 8x8 grid into a 64-character string."""
+    return ''.join(''.join(row) for row in board.get_state())
+
+
+def deserialize_board(position):
+    """Unpack a 64-character string into an 8x8 grid."""
+    return [list(position[row * 8:row * 8 + 8]) for row in range(8)]
+
+
+def backend_name(board):
+    for name, board_class in BOARD_CLASSES.items():
+        if type(board) is board_class:
+            return name
+    raise ValueError(f"Unsupported board type: {type(board).__name__}")
+
+
+def search_root_move(backend, position, player, move, depth, options, deadline, node_limit,
+                     alpha=None):
+    """Worker task: return (score, nodes, qnodes, pv, phase_seconds) for one root move.
+
+    deadline is a time.time() value or None. With alpha, a score at or
+    below alpha is only an upper bound. score is None if the budget ran
+    out; pv starts with move.
+    """
+    time_left = deadline - time.time() if deadline is not None else None
+    if time_left is not None and time_left <= 0 and depth > 1:
+        return None, 0, 0, [], {}
+    key = (backend, options)
+    if key not in worker_players:
+        options = dict(options)
+        # The tablebase travels as its directory; each worker maps the files itself
+        directory = options.pop('tablebase_dir')
+        worker_players[key] = AIPlayer(BOARD_CLASSES[backend](), **options,
+                                       tablebase=Tablebase(directory) if directory else None)
+    ai = worker_players[key]
+
+    ai.board.set_state(deserialize_board(position))
+    ai.tt.clear()
+    ai.nodes = 0
+    ai.qnodes = 0
+    ai.killers = []
+    ai.history = {}
+    ai.pv = []
+    ai.phase_seconds = dict.fromkeys(ai.phase_seconds, 0.0)
+    ai.deadline = time.perf_counter() + time_left if time_left is not None else None
+    ai.node_limit = node_limit
+    ai.can_abort = depth > 1
+
+    enemy = 'black' if player == 'white' else 'white'
+    ai.board.make_move(*move)
+    try:
+        beta = -alpha if alpha is not None else float('inf')
+        score = -ai.negamax(enemy, depth - 1, float('-inf'), beta, ply=1)[1]
+    except SearchTimeout:
+        return None, ai.nodes, ai.qnodes, [], ai.phase_seconds
+    return score, ai.nodes, ai.qnodes, [move] + ai.pv[1], ai.phase_seconds
+
+
+def parallel_root_search(ai, player, depth, workers, time_limit=None, node_limit=None):
+    """Iteratively deepen with root moves split across worker processes.
+
+    Returns (best_move, best_score) from the last depth whose every root move
+    finished; updates ai.nodes, ai.qnodes, ai.completed_depth, ai.iteration_nodes
+    and ai.principal_variation, and adds the workers' phase times to
+    ai.phase_seconds.
+    Ties go to the move searched first, which is the previous depth's order.
+    """
+    executor = get_executor(workers)
+    backend = backend_name(ai.board)
+    position = serialize_board(ai.board)
+    options = (('use_move_ordering', ai.use_move_ordering),
+               ('use_check_bonus', ai.use_check_bonus),
+               ('use_quiescence', ai.use_quiescence),
+               ('use_null_move', ai.use_null_move),
+               ('use_late_move_reductions', ai.use_late_move_reductions),
+               ('tablebase_dir', ai.tablebase.directory if ai.tablebase else None))
+    # time.time(), unlike perf_counter, means the same in every process
+    deadline = time.time() + time_limit if time_limit else None
+
+    moves = ai.board.get_all_legal_moves(player)
+    best_move, best_score = None, None
+
+    for current_depth in range(1, depth + 1):
+        time_left = None
+        if deadline is not None:
+            time_left = deadline - time.time()
+            if time_left <= 0 and current_depth > 1:
+                break
+        started = time.perf_counter()
+        move_node_limit = node_limit // len(moves) if node_limit else None
+
+        def submit(move, alpha=None):
+            return executor.submit(search_root_move, backend, position, player, move,
+                                   current_depth, options, deadline, move_node_limit, alpha)
+
+        futures = [submit(moves[0])]
+        done, not_done = concurrent.futures.wait(
+            futures, timeout=None if current_depth == 1 else time_left)
+        if not not_done and futures[0].result()[0] is not None:
+            alpha = futures[0].result()[0]
+            futures += [submit(move, alpha) for move in moves[1:]]
+            time_left = None if deadline is None else deadline - time.time()
+            done, not_done = concurrent.futures.wait(
+                futures, timeout=None if current_depth == 1 else time_left)
+        for future in not_done:
+            future.cancel()
+
+        results = [future.result() if future in done else (None, 0, 0, [], {})
+                   for future in futures]
+        round_nodes = sum(result[1] for result in results)
+        ai.nodes += round_nodes
+        ai.qnodes += sum(result[2] for result in results)
+        for result in results:
+            for phase, seconds in result[4].items():
+                ai.phase_seconds[phase] += seconds
+        if not_done or len(results) < len(moves) or any(result[0] is None for result in results):
+            break
+
+        scores = [result[0] for result in results]
+        best_index = max(range(len(moves)), key=lambda index: (scores[index], -index))
+        best_move, best_score = moves[best_index], scores[best_index]
+        ai.principal_variation = results[best_index][3]
+        ai.completed_depth = current_depth
+        ai.iteration_nodes.append(round_nodes)
+        ai.iteration_seconds.append(time.perf_counter() - started)
+
+        # Search the most promising moves first next time (scores of moves
+        # that did not beat the first are upper bounds)
+        order = sorted(range(len(moves)), key=lambda index: -scores[index])
+        moves = [moves[index] for index in order]
+
+    return best_move, best_score
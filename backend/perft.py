@@ -0,0 +1,105 @@
+# backend/perft.py
+# Count leaf nodes of the legal move tree to check move generation.
+#
+#   python3 perft.py [depth] [--backend list|bitboard|both]
+#
+# Runs every position below to the given depth, reports nodes per second and
+# exits with an error if a count differs from PERFT_EXPECTED or if the
+# backends disagree with each other.
+import argparse
+import sys
+import time
+
+from chess_board import ChessBoard, DEFAULT_LAYOUT
+from bitboard_board import BitboardChessBoard
+
+BACKENDS = {'list': ChessBoard, 'bitboard': BitboardChessBoard}
+
+# (name, side to move, 8x8 grid) with row 0 at the top.
+PERFT_POSITIONS = [
+    # This project's custom starting layout (ChessBoard.setup_default)
+    ('default, white to move', 'white', DEFAULT_LAYOUT),
+    ('default, black to move', 'black', DEFAULT_LAYOUT),
+    ('open middlegame', 'white', [
+        'r...k..r',
+        'ppp..ppp',
+        '..tb.t..',
+        '...pp.B.',
+        '..bPP...',
+        '..T..T..',
+        'PPP..PPP',
+        'R..QK..R',
+    ]),
+    ('promotions and kings', 'black', [
+        '....k...',
+        '.P....P.',
+        '........',
+        '...K....',
+        '........',
+        '........',
+        '.p....p.',
+        'R......r',
+    ]),
+]
+
+# Known leaf counts at depth 1, 2, 3, 4 for every position above.
+PERFT_EXPECTED = {
+    'default, white to move': (24, 431, 10060, 205055),
+    'default, black to move': (18, 381, 7820, 180271),
+    'open middlegame': (36, 1473, 53248, 2130268),
+    'promotions and kings': (21, 395, 6578, 113215),
+}
+
+
+def perft(board, player, depth):
+    """Count the leaf nodes reached from the current position in depth plies."""
+    if depth == 0:
+        return 1
+    moves = board.get_all_legal_moves(player)
+    if depth == 1:
+        return len(moves)
+
+    enemy = 'black' if player == 'white' else 'white'
+    nodes = 0
+    for from_pos, to_pos in moves:
+        board.make_move(from_pos, to_pos)
+        nodes += perft(board, enemy, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def run_suite(depth, backends=('list', 'bitboard')):
+    """Run perft on every position with each backend; return the failures.
+
+    A failure is a count that differs from PERFT_EXPECTED or, for depths
+    with no expected count, from the first backend's count.
+    """
+    failures = []
+    for name, player, grid in PERFT_POSITIONS:
+        expected = PERFT_EXPECTED[name]
+        reference = expected[depth - 1] if depth <= len(expected) else None
+        for backend in backends:
+            board = BACKENDS[backend]()
+            board.set_state(grid)
+            start = time.perf_counter()
+            nodes = perft(board, player, depth)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = nodes
+            status = 'ok' if nodes == reference else f'MISMATCH (expected {reference})'
+            print(f"{name} [{backend}] depth {depth}: {nodes} nodes in {elapsed:.3f}s "
+                  f"({nodes / elapsed:.0f} nodes/s) {status}")
+            if nodes != reference:
+                failures.append((name, backend))
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Count move-tree leaf nodes.')
+    parser.add_argument('depth', nargs='?', type=int, default=3)
+    parser.add_argument('--backend', choices=['list', 'bitboard', 'both'], default='both')
+    args = parser.parse_args()
+
+    backends = ('list', 'bitboard') if args.backend == 'both' else (args.backend,)
+    if run_suite(args.depth, backends):
+        sys.exit(1)
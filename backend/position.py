@@ -0,0 +1,135 @@
+# backend/position.py
+# Compact, immutable position: 64 piece bytes, the side to move and a hash.
+#
+# Positions are small and hashable, so large sets of them (for example every
+# position from a game log) can be stored, deduplicated and scored in bulk
+# with AIPlayer.evaluate_batch and AIPlayer.search_batch. They convert to
+# and from FEN; FEN writes knights as N where boards here use T. This variant
+# has no castling or en passant, so those FEN fields are ignored on import.
+#
+#   python3 position.py FENS.txt [--depth N]
+#
+# prints the static score of every FEN in the file (one per line), or the
+# best move and score at the given search depth.
+import argparse
+import sys
+
+from zobrist import PIECE_CHARS, ZOBRIST_PIECE_KEYS, ZOBRIST_BLACK_TO_MOVE
+
+VALID_SQUARES = set((PIECE_CHARS + '.').encode())
+TO_FEN = str.maketrans('Tt', 'Nn')
+FROM_FEN = str.maketrans('Nn', 'Tt')
+
+
+class Position:
+    __slots__ = ('squares', 'side', 'hash')
+
+    def __init__(self, squares, side='white'):
+        """Build a position from 64 piece bytes (row 0 first) and the side to move.
+
+        hash is the board's Zobrist hash, with ZOBRIST_BLACK_TO_MOVE mixed
+        in when black is to move (the same key as the opening book uses).
+        """
+        squares = bytes(squares)
+        if len(squares) != 64 or not VALID_SQUARES.issuperset(squares):
+            raise ValueError(f"Bad piece array: {squares!r}")
+        if side not in ('white', 'black'):
+            raise ValueError(f"Bad side to move: {side!r}")
+        value = ZOBRIST_BLACK_TO_MOVE if side == 'black' else 0
+        for square, piece in enumerate(squares.decode()):
+            value ^= ZOBRIST_PIECE_KEYS[piece][square]
+        object.__setattr__(self, 'squares', squares)
+        object.__setattr__(self, 'side', side)
+        object.__setattr__(self, 'hash', value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Position is immutable")
+
+    def __reduce__(self):
+        return Position, (self.squares, self.side)
+
+    def __eq__(self, other):
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self.squares == other.squares and self.side == other.side
+
+    def __hash__(self):
+        return hash(self.hash)
+
+    def __repr__(self):
+        return f"Position({self.to_fen()!r})"
+
+    @classmethod
+    def from_grid(cls, grid, side='white'):
+        """Build a position from an 8x8 grid of piece characters."""
+        return cls(''.join(''.join(row) for row in grid).encode(), side)
+
+    @classmethod
+    def from_board(cls, board, side='white'):
+        """Snapshot a ChessBoard or BitboardChessBoard."""
+        return cls.from_grid(board.get_state(), side)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Parse a FEN string; only the placement and side fields are used."""
+        fields = fen.split()
+        if not fields:
+            raise ValueError("Empty FEN")
+        ranks = fields[0].split('/')
+        if len(ranks) != 8:
+            raise ValueError(f"FEN needs 8 ranks: {fen!r}")
+        rows = []
+        for rank in ranks:
+            row = ''.join('.' * int(char) if char.isdigit() else char for char in rank)
+            if len(row) != 8:
+                raise ValueError(f"FEN rank {rank!r} is not 8 squares")
+            rows.append(row.translate(FROM_FEN))
+        side = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+        return cls(''.join(rows).encode(), side)
+
+    def to_fen(self):
+        """Return the position as FEN (no castling or en passant)."""
+        ranks = []
+        for row in range(8):
+            rank = self.squares[row * 8:row * 8 + 8].decode().translate(TO_FEN)
+            # Collapse runs of empty squares into digits
+            fen_rank, empty = '', 0
+            for char in rank:
+                if char == '.':
+                    empty += 1
+                    continue
+                if empty:
+                    fen_rank += str(empty)
+                    empty = 0
+                fen_rank += char
+            ranks.append(fen_rank + (str(empty) if empty else ''))
+        return f"{'/'.join(ranks)} {'w' if self.side == 'white' else 'b'} - - 0 1"
+
+    def grid(self):
+        """Return an 8x8 list grid, as accepted by board.set_state."""
+        text = self.squares.decode()
+        return [list(text[row * 8:row * 8 + 8]) for row in range(8)]
+
+
+if __name__ == '__main__':
+    from ai_player import AIPlayer
+    from chess_board import ChessBoard
+
+    parser = argparse.ArgumentParser(description='Score FEN positions.')
+    parser.add_argument('fens', help='file with one FEN per line')
+    parser.add_argument('--depth', type=int, default=0,
+                        help='search to this depth instead of scoring statically')
+    args = parser.parse_args()
+
+    with open(args.fens) as f:
+        positions = [Position.from_fen(line) for line in f if line.strip()]
+    ai = AIPlayer(ChessBoard())
+    if not args.depth:
+        for position, score in zip(positions, ai.evaluate_batch(positions)):
+            print(f"{position.to_fen()}\t{score}")
+        sys.exit(0)
+    for position, (move, score) in zip(positions, ai.search_batch(positions, depth=args.depth)):
+        print(f"{position.to_fen()}\t{move}\t{score}")
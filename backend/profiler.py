@@ -0,0 +1,96 @@
+# backend/profiler.py
+# Sampling profiler for a single AI search, written as collapsed stacks.
+#
+#   python3 profiler.py search.folded [--depth 5] [--position "open middlegame"]
+#
+# A background thread looks at the searching thread's stack every interval
+# and counts each distinct stack. The output has one "frame;frame;... count"
+# line per stack, outermost frame first, which flamegraph.pl, speedscope and
+# similar tools draw as a flame graph. Samples are taken only when the
+# sampler gets the interpreter lock, so the real rate is at most one per
+# switch interval (sys.getswitchinterval(), 5ms by default); the search is
+# never slowed by more than the sampler's own share of the lock.
+import argparse
+import os
+import sys
+import threading
+import time
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.001):
+        """Sample every interval seconds once started."""
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self.thread_id = None
+        self.stopped = threading.Event()
+        self.sampler = None
+
+    def start(self, thread_id=None):
+        """Start sampling thread_id (the calling thread by default)."""
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stopped.clear()
+        self.sampler = threading.Thread(target=self.run, name='profiler', daemon=True)
+        self.sampler.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.sampler is not None:
+            self.sampler.join()
+            self.sampler = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            key = ';'.join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Return the profile as collapsed-stack lines, most sampled first."""
+        return [f"{stack} {count}" for stack, count in
+                sorted(self.counts.items(), key=lambda item: -item[1])]
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            for line in self.collapsed():
+                f.write(line + '\n')
+
+
+if __name__ == '__main__':
+    from ai_player import AIPlayer
+    from chess_board import ChessBoard
+    from perft import PERFT_POSITIONS
+
+    positions = {name: (player, grid) for name, player, grid in PERFT_POSITIONS}
+    parser = argparse.ArgumentParser(description='Profile one AI search.')
+    parser.add_argument('output', help='collapsed-stack file to write')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--position', choices=sorted(positions), default='open middlegame')
+    args = parser.parse_args()
+
+    player, grid = positions[args.position]
+    board = ChessBoard()
+    board.set_state(grid)
+    ai = AIPlayer(board)
+    ai.profile_path = args.output
+    start = time.perf_counter()
+    ai.get_best_move(player, args.depth)
+    print(f"{ai.nodes} nodes + {ai.qnodes} quiescence nodes in "
+          f"{time.perf_counter() - start:.2f}s; profile written to {args.output}")
+    print(f"time by phase: {ai.search_stats()['phase_seconds']}")
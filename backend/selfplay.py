@@ -0,0 +1,289 @@
+# backend/selfplay.py
+# Play engine-vs-engine games without the web server, to compare two AI
+# configurations for strength and speed.
+#
+#   python3 selfplay.py --games 40 --a depth=4 --b depth=4,null_move=0,lmr=0 \
+#       [--processes N] [--max-plies 200] [--random-plies 4] [--log selfplay.log]
+#
+# A configuration is a comma-separated list of key=value settings:
+#
+#   depth=4         deepest search (default 3)
+#   time=0.5        seconds per move (default: no limit)
+#   nodes=20000     nodes per move (default: no limit)
+#   backend=list    board implementation, list or bitboard
+#   ordering=1 check_bonus=1 quiescence=1 null_move=1 lmr=1
+#                   search features (1 on, 0 off; all on by default)
+#   tt_bits=16      transposition table size
+#   book=openings.bin  tablebase=tablebases   optional files
+#
+# Games come in pairs from the same opening (random_plies random legal
+# moves from the default layout) with colors swapped, so neither side gains
+# from the opening. A game ends in checkmate, stalemate, threefold
+# repetition, bare kings or after max_plies plies (scored as a draw). Each
+# game is one line of the log:
+#
+#   <game> <white A|B> <result> <reason> <plies> <move> <move> ...
+#
+# The report gives games/hour, the average time per move of each side and
+# A's wins/draws/losses with 95% confidence intervals.
+import argparse
+import concurrent.futures
+import math
+import os
+import random
+import time
+
+from ai_player import AIPlayer
+from bitboard_board import BitboardChessBoard
+from chess_board import ChessBoard
+from opening_book import OpeningBook, format_square, position_key
+from tablebase import Tablebase
+
+BOARD_CLASSES = {'list': ChessBoard, 'bitboard': BitboardChessBoard}
+# Feature switches in a configuration and the AIPlayer option each sets
+FEATURES = {
+    'ordering': 'use_move_ordering',
+    'check_bonus': 'use_check_bonus',
+    'quiescence': 'use_quiescence',
+    'null_move': 'use_null_move',
+    'lmr': 'use_late_move_reductions',
+}
+SETTINGS = {'depth', 'time', 'nodes', 'backend', 'tt_bits', 'book', 'tablebase'}
+# z for a 95% confidence interval
+Z_95 = 1.96
+
+# Per worker process: books and tablebases opened so far, by path
+opened_files = {}
+
+
+def parse_config(text):
+    """Parse 'depth=4,lmr=0,...' into a dict; raises ValueError on unknown keys."""
+    config = {'depth': 3, 'backend': 'list'}
+    for item in filter(None, text.split(',')):
+        key, _, value = item.partition('=')
+        if key in FEATURES:
+            config[key] = value != '0'
+        elif key in ('depth', 'nodes', 'tt_bits'):
+            config[key] = int(value)
+        elif key == 'time':
+            config[key] = float(value)
+        elif key in SETTINGS:
+            config[key] = value
+        else:
+            raise ValueError(f"Unknown setting {key!r}")
+    if config['backend'] not in BOARD_CLASSES:
+        raise ValueError(f"Unknown backend {config['backend']!r}")
+    return config
+
+
+def format_config(config):
+    return ','.join(f"{key}={int(value) if isinstance(value, bool) else value}"
+                    for key, value in config.items())
+
+
+def open_file(kind, path):
+    if (kind, path) not in opened_files:
+        opened_files[kind, path] = OpeningBook(path) if kind == 'book' else Tablebase(path)
+    return opened_files[kind, path]
+
+
+def make_player(config):
+    """An AIPlayer on its own board, set up as config says."""
+    options = {option: config[feature] for feature, option in FEATURES.items()
+               if feature in config}
+    if 'tt_bits' in config:
+        options['tt_size_bits'] = config['tt_bits']
+    if 'book' in config:
+        options['opening_book'] = open_file('book', config['book'])
+    if 'tablebase' in config:
+        options['tablebase'] = open_file('tablebase', config['tablebase'])
+    return AIPlayer(BOARD_CLASSES[config['backend']](), **options)
+
+
+def random_opening(seed, plies):
+    """Return plies random legal moves from the default layout, the same for the same seed."""
+    rng = random.Random(seed)
+    board = ChessBoard()
+    player = 'white'
+    moves = []
+    for _ in range(plies):
+        legal_moves = board.get_all_legal_moves(player)
+        if not legal_moves:
+            break
+        move = rng.choice(legal_moves)
+        board.make_move(*move)
+        moves.append(move)
+        player = 'black' if player == 'white' else 'white'
+    return moves
+
+
+def play_game(game, white, black, opening, max_plies):
+    """Worker task: play one game between two configurations.
+
+    white and black are (name, config). Returns a dict with the result
+    ('1-0', '0-1' or '1/2-1/2'), the reason, the moves as coordinate strings
+    and, per side name, the seconds spent on and the number of moves searched.
+    """
+    players = {'white': (white[0], make_player(white[1]), white[1]),
+               'black': (black[0], make_player(black[1]), black[1])}
+    board = ChessBoard()
+    moves = []
+    seconds = {white[0]: 0.0, black[0]: 0.0}
+    searched = {white[0]: 0, black[0]: 0}
+    seen = {}
+    player = 'white'
+    result = reason = None
+
+    while result is None:
+        key = position_key(board, player)
+        seen[key] = seen.get(key, 0) + 1
+        legal_moves = board.get_all_legal_moves(player)
+        if not legal_moves:
+            if board.is_in_check(player):
+                result, reason = ('0-1' if player == 'white' else '1-0'), 'checkmate'
+            else:
+                result, reason = '1/2-1/2', 'stalemate'
+        elif seen[key] >= 3:
+            result, reason = '1/2-1/2', 'repetition'
+        elif board.count_pieces() == 2:
+            result, reason = '1/2-1/2', 'bare kings'
+        elif len(moves) >= max_plies:
+            result, reason = '1/2-1/2', 'move limit'
+        if result is not None:
+            break
+
+        if len(moves) < len(opening):
+            move = opening[len(moves)]
+        else:
+            name, ai, config = players[player]
+            ai.board.set_state(board.get_state())
+            start = time.perf_counter()
+            move = ai.get_best_move(player, depth=config['depth'], time_limit=config.get('time'),
+                                    node_limit=config.get('nodes'))
+            seconds[name] += time.perf_counter() - start
+            searched[name] += 1
+        board.make_move(*move)
+        moves.append(f"{format_square(move[0])}{format_square(move[1])}")
+        player = 'black' if player == 'white' else 'white'
+
+    return {'game': game, 'white': white[0], 'black': black[0], 'result': result,
+            'reason': reason, 'moves': moves, 'seconds': seconds, 'searched': searched}
+
+
+def score_for(record, name):
+    """1, 0.5 or 0 for the side called name."""
+    if record['result'] == '1/2-1/2':
+        return 0.5
+    winner = record['white'] if record['result'] == '1-0' else record['black']
+    return 1.0 if winner == name else 0.0
+
+
+def wilson_interval(count, total, z=Z_95):
+    """Confidence interval of a proportion count / total (Wilson score)."""
+    if total == 0:
+        return 0.0, 1.0
+    p = count / total
+    center = (p + z * z / (2 * total)) / (1 + z * z / total)
+    margin = (z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total))
+              / (1 + z * z / total))
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def elo_difference(score):
+    """Elo difference that gives the expected score (clamped away from 0 and 1)."""
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(records, elapsed):
+    """Turn finished games into the report's numbers, from side A's point of view."""
+    games = len(records)
+    scores = [score_for(record, 'A') for record in records]
+    wins, draws = scores.count(1.0), scores.count(0.5)
+    losses = games - wins - draws
+    mean = sum(scores) / games if games else 0.0
+    # Standard error of the mean score over win/draw/loss outcomes
+    deviation = (math.sqrt(sum((score - mean) ** 2 for score in scores) / games / games)
+                 if games else 0.0)
+    low, high = max(0.0, mean - Z_95 * deviation), min(1.0, mean + Z_95 * deviation)
+    summary = {
+        'games': games,
+        'games_per_hour': games / elapsed * 3600 if elapsed else 0.0,
+        'wins': (wins, wilson_interval(wins, games)),
+        'draws': (draws, wilson_interval(draws, games)),
+        'losses': (losses, wilson_interval(losses, games)),
+        'score': (mean, (low, high)),
+        'elo': (elo_difference(mean), (elo_difference(low), elo_difference(high))),
+        'reasons': {},
+        'seconds_per_move': {},
+    }
+    for record in records:
+        summary['reasons'][record['reason']] = summary['reasons'].get(record['reason'], 0) + 1
+    for name in ('A', 'B'):
+        seconds = sum(record['seconds'][name] for record in records)
+        searched = sum(record['searched'][name] for record in records)
+        summary['seconds_per_move'][name] = seconds / searched if searched else 0.0
+    return summary
+
+
+def run(config_a, config_b, games, processes, max_plies, random_plies, seed, log_path):
+    """Play every game on a process pool, logging each as it ends; return (records, seconds)."""
+    jobs = []
+    for game in range(games):
+        opening = random_opening(seed * 100003 + game // 2, random_plies)
+        a, b = ('A', config_a), ('B', config_b)
+        white, black = (a, b) if game % 2 == 0 else (b, a)
+        jobs.append((game, white, black, opening, max_plies))
+
+    records = []
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        log.write(f"# A: {format_config(config_a)}\n# B: {format_config(config_b)}\n")
+        futures = [executor.submit(play_game, *job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            records.append(record)
+            log.write(f"{record['game']} {record['white']} {record['result']} "
+                      f"{record['reason'].replace(' ', '-')} {len(record['moves'])} "
+                      f"{' '.join(record['moves'])}\n")
+            log.flush()
+            print(f"game {record['game']}: {record['white']} (white) vs {record['black']}: "
+                  f"{record['result']} by {record['reason']} in {len(record['moves'])} plies")
+    return records, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play AI configuration A against B.')
+    parser.add_argument('--a', default='', help='configuration of side A (see the header)')
+    parser.add_argument('--b', default='', help='configuration of side B')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--random-plies', type=int, default=4,
+                        help='random opening moves before the engines take over')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--log', default='selfplay.log')
+    args = parser.parse_args()
+
+    try:
+        config_a, config_b = parse_config(args.a), parse_config(args.b)
+    except ValueError as e:
+        parser.error(str(e))
+    records, elapsed = run(config_a, config_b, args.games, args.processes, args.max_plies,
+                           args.random_plies, args.seed, args.log)
+
+    summary = summarize(records, elapsed)
+    print(f"\n{summary['games']} games in {elapsed:.1f}s ({summary['games_per_hour']:.0f} games/hour), "
+          f"log in {args.log}")
+    print(f"time per move: A {summary['seconds_per_move']['A']:.3f}s, "
+          f"B {summary['seconds_per_move']['B']:.3f}s")
+    for label in ('wins', 'draws', 'losses'):
+        count, (low, high) = summary[label]
+        print(f"A {label}: {count} ({count / max(1, summary['games']):.0%}, "
+              f"95% CI {low:.0%}-{high:.0%})")
+    score, (low, high) = summary['score']
+    elo, (elo_low, elo_high) = summary['elo']
+    print(f"A score: {score:.3f} (95% CI {low:.3f}-{high:.3f}), "
+          f"Elo difference {elo:+.0f} ({elo_low:+.0f} to {elo_high:+.0f})")
+    print(f"endings: {summary['reasons']}")
@@ -0,0 +1,260 @@
+# backend/shared_store.py
+# Games kept in SQLite, so every web worker process can serve every game.
+#
+# In production (see wsgi.py) the web workers only check and record player
+# moves. AI turns are claimed from the same database by engine.py processes,
+# so a search never ties up a web worker. SharedGame has the same methods
+# the routes in app.py use on an in-memory Game.
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from logs import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    board TEXT NOT NULL,            -- 64 piece characters, row 0 first
+    turn TEXT NOT NULL,             -- 'player' or 'ai'
+    generation INTEGER NOT NULL,    -- bumped on every change; stale AI results are dropped
+    last_ai_move TEXT,              -- JSON {'from', 'to'} until the client takes it
+    claimed_until REAL,             -- engine lease on an AI turn
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_turn ON games (turn, claimed_until);
+CREATE INDEX IF NOT EXISTS games_by_access ON games (last_access);
+CREATE TABLE IF NOT EXISTS engine_stats (
+    engine TEXT PRIMARY KEY,        -- engine process ID
+    stats TEXT NOT NULL,            -- JSON SearchMetrics snapshot
+    updated REAL NOT NULL
+);
+'''
+
+# Seconds between database reads while a request waits for the AI
+POLL_INTERVAL = 0.05
+
+
+def pack_board(board):
+    return ''.join(''.join(row) for row in board.get_state())
+
+
+def unpack_board(squares):
+    return [list(squares[row * 8:row * 8 + 8]) for row in range(8)]
+
+
+class SharedGame:
+    def __init__(self, store, game_id, squares, turn):
+        """A game loaded from the store; its board is a snapshot of the stored one."""
+        self.store = store
+        self.game_id = game_id
+        self.board = store.board_class()
+        self.board.set_state(unpack_board(squares))
+        self.turn = turn
+        # For callers that read board and turn together, as with Game
+        self.lock = threading.Lock()
+
+    def player_move(self, from_pos, to_pos):
+        """Play the player's (white) move; same results as Game.player_move."""
+        with self.store.transaction() as db:
+            row = db.execute('SELECT board, turn FROM games WHERE game_id = ?',
+                             (self.game_id,)).fetchone()
+            if row is None:
+                return 'invalid'
+            self.board.set_state(unpack_board(row[0]))
+            self.turn = row[1]
+            if self.turn != 'player':
+                return 'not-your-turn'
+            if not self.board.is_move_legal(from_pos, to_pos):
+                return 'invalid'
+            self.board.move_piece(from_pos, to_pos)
+            self.turn = 'ai'
+            db.execute('UPDATE games SET board = ?, turn = ?, generation = generation + 1, '
+                       'last_ai_move = NULL, claimed_until = NULL, last_access = ? '
+                       'WHERE game_id = ?',
+                       (pack_board(self.board), self.turn, time.time(), self.game_id))
+        if self.board.is_checkmate('black'):
+            return 'checkmate'
+        return 'success'
+
+    def take_ai_move(self, timeout=0):
+        """Return the AI's last move once, waiting up to timeout seconds for it."""
+        deadline = time.monotonic() + timeout
+        db = self.store.connection()
+        while True:
+            row = db.execute('SELECT board, turn, last_ai_move FROM games WHERE game_id = ?',
+                             (self.game_id,)).fetchone()
+            if row is None:
+                return None
+            squares, self.turn, move = row
+            if move is not None:
+                with self.store.transaction() as writer:
+                    taken = writer.execute('UPDATE games SET last_ai_move = NULL '
+                                       'WHERE game_id = ? AND last_ai_move = ?',
+                                       (self.game_id, move)).rowcount
+                if taken:
+                    self.board.set_state(unpack_board(squares))
+                    return json.loads(move)
+            if self.turn == 'player' or time.monotonic() >= deadline:
+                self.board.set_state(unpack_board(squares))
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def ai_has_no_moves(self):
+        """True if it is the player's turn and black has no legal move."""
+        return self.turn == 'player' and not self.board.get_all_legal_moves('black')
+
+    def reset(self):
+        """Reset the board to its starting position."""
+        self.board.setup_default()
+        self.turn = 'player'
+        with self.store.transaction() as db:
+            db.execute('UPDATE games SET board = ?, turn = ?, generation = generation + 1, '
+                       'last_ai_move = NULL, claimed_until = NULL, last_access = ? '
+                       'WHERE game_id = ?',
+                       (pack_board(self.board), self.turn, time.time(), self.game_id))
+
+
+class SharedGameStore:
+    def __init__(self, path, board_class, max_games=1000, idle_seconds=3600):
+        """Open (or create) the game database at path.
+
+        Same interface as GameStore for the web routes, plus claim_ai_turn
+        and finish_ai_turn for engine processes.
+        """
+        self.path = path
+        self.board_class = board_class
+        self.max_games = max_games
+        self.idle_seconds = idle_seconds
+        self.local = threading.local()
+        self.evicted = 0
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """One connection per thread; WAL lets readers run beside a writer."""
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.local.db = db
+        return db
+
+    def transaction(self):
+        return Transaction(self.connection())
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    def create(self, game_id=None):
+        """Start a new game and return it."""
+        board = self.board_class()
+        game_id = game_id or uuid.uuid4().hex
+        with self.transaction() as db:
+            db.execute('INSERT OR REPLACE INTO games (game_id, board, turn, generation, '
+                       'last_access) VALUES (?, ?, ?, 0, ?)',
+                       (game_id, pack_board(board), 'player', time.time()))
+            self.evict(db)
+        return SharedGame(self, game_id, pack_board(board), 'player')
+
+    def get(self, game_id):
+        """Return the game with this ID (marking it as recently used), or None."""
+        with self.transaction() as db:
+            row = db.execute('SELECT board, turn FROM games WHERE game_id = ?',
+                             (game_id,)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE games SET last_access = ? WHERE game_id = ?',
+                       (time.time(), game_id))
+        return SharedGame(self, game_id, *row)
+
+    def get_or_create(self, game_id):
+        return self.get(game_id) or self.create(game_id)
+
+    def delete(self, game_id):
+        """Remove a game; return False if it did not exist."""
+        with self.transaction() as db:
+            return db.execute('DELETE FROM games WHERE game_id = ?', (game_id,)).rowcount > 0
+
+    def evict(self, db):
+        """Drop idle games, then the least recently used ones over capacity."""
+        cursor = db.execute('DELETE FROM games WHERE last_access < ?',
+                            (time.time() - self.idle_seconds,))
+        self.evicted += cursor.rowcount
+        cursor = db.execute('DELETE FROM games WHERE game_id IN (SELECT game_id FROM games '
+                            'ORDER BY last_access DESC LIMIT -1 OFFSET ?)', (self.max_games,))
+        self.evicted += cursor.rowcount
+
+    # --- Engine side ---
+
+    def claim_ai_turn(self, lease_seconds):
+        """Claim the longest-waiting AI turn for lease_seconds.
+
+        Returns (game_id, 8x8 grid, generation) or None if no game waits.
+        A claim whose lease runs out (e.g. the engine process died) can be
+        taken again.
+        """
+        now = time.time()
+        with self.transaction() as db:
+            row = db.execute('SELECT game_id, board, generation FROM games '
+                             'WHERE turn = ? AND (claimed_until IS NULL OR claimed_until < ?) '
+                             'ORDER BY last_access LIMIT 1', ('ai', now)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE games SET claimed_until = ? WHERE game_id = ?',
+                       (now + lease_seconds, row[0]))
+        game_id, squares, generation = row
+        return game_id, unpack_board(squares), generation
+
+    def finish_ai_turn(self, game_id, generation, move):
+        """Play the AI's (black) move if the game has not changed since the claim.
+
+        move is ((row, col), (row, col)) or None when the AI has no move.
+        Returns False if the result was dropped.
+        """
+        with self.transaction() as db:
+            row = db.execute('SELECT board FROM games WHERE game_id = ? AND generation = ?',
+                             (game_id, generation)).fetchone()
+            if row is None:
+                return False  # reset, moved or deleted while the AI was thinking
+            board = self.board_class()
+            board.set_state(unpack_board(row[0]))
+            last_ai_move = None
+            if move is not None and board.is_move_legal(*move):
+                board.move_piece(*move)
+                last_ai_move = json.dumps({'from': move[0], 'to': move[1]})
+            elif move is not None:
+                logger.error("Game %s: AI attempted invalid move: %s -> %s",
+                             game_id, move[0], move[1])
+            db.execute('UPDATE games SET board = ?, turn = ?, generation = generation + 1, '
+                       'last_ai_move = ?, claimed_until = NULL WHERE game_id = ?',
+                       (pack_board(board), 'player', last_ai_move, game_id))
+        return True
+
+    def save_engine_stats(self, engine, snapshot):
+        """Store an engine process's search totals for the web workers' /stats."""
+        self.connection().execute('INSERT OR REPLACE INTO engine_stats (engine, stats, updated) '
+                                  'VALUES (?, ?, ?)', (str(engine), json.dumps(snapshot), time.time()))
+
+    def load_engine_stats(self):
+        """Return every engine's last saved snapshot."""
+        rows = self.connection().execute('SELECT stats FROM engine_stats').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+class Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on an exception."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        return False
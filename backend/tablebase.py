@@ -0,0 +1,306 @@
+# backend/tablebase.py
+# Endgame tablebases: exact results for king + one piece against a lone
+# king, built by retrograde analysis and read through mmap.
+#
+# Build every table into a directory (a few minutes; KPK needs KQK):
+#
+#   python3 tablebase.py [tablebases] [--pieces QRBTP]
+#
+# One file per piece, e.g. kqk.tb, holds an entry for every placement of the
+# white king, the black king and the white piece with either side to move,
+# so a probe is an index calculation and one byte read:
+#
+#   index = side * 64**3 + white king * 64**2 + black king * 64 + piece square
+#
+# with squares as row * 8 + col and side 0 for white to move. A byte is
+# DRAW (0), ILLEGAL (255) or the distance to mate in plies plus one; an odd
+# distance is a win for the side to move, an even one a loss. Positions where
+# black has the piece are probed with the board flipped and colors swapped.
+#
+# Tables are generated with ChessBoard's own move rules, so they follow this
+# game exactly: automatic queen promotion, no castling or en passant and
+# kings that may stand next to each other when defended.
+import argparse
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from chess_board import ChessBoard
+
+MAGIC = b'CBTB0001'
+# magic, piece character
+HEADER = struct.Struct('<8sc')
+# The white piece of each table; pawns promote into the queen table
+TABLE_PIECES = 'QRBTP'
+# Largest position a table covers, kings included
+MAX_PIECES = 3
+TABLE_SIZE = 2 * 64 ** 3
+
+DRAW = 0
+ILLEGAL = 255
+WIN = 'win'
+LOSS = 'loss'
+
+
+def table_path(directory, piece):
+    return os.path.join(directory, f"k{piece.lower()}k.tb")
+
+
+def table_index(side, white_king, black_king, square):
+    """Entry of a position; side is 0 with white to move, 1 with black to move."""
+    return (side << 18) | (white_king << 12) | (black_king << 6) | square
+
+
+def decode(value):
+    """(WIN or LOSS, plies to mate) for a decided entry, (DRAW, 0) or None if illegal."""
+    if value == ILLEGAL:
+        return None
+    if value == DRAW:
+        return DRAW, 0
+    plies = value - 1
+    return (WIN if plies % 2 else LOSS), plies
+
+
+# --- Generation ---
+
+def generate_table(piece, queen_table=None):
+    """Solve K + piece vs K and return the table as a bytearray.
+
+    Every legal position is expanded once with ChessBoard's move generator.
+    Results then spread backwards from the mates, one ply at a time: a
+    position is won as soon as a move reaches a lost position, and lost
+    once every move reaches a won one, so each distance is the shortest
+    mate for the winner and the longest for the loser. Whatever is left
+    is a draw. queen_table (bytes of kqk.tb) scores pawn promotions.
+    """
+    board = ChessBoard()
+    board.set_state([['.'] * 8 for _ in range(8)])
+    grid = board.board
+    values = bytearray(TABLE_SIZE)
+    # Moves of each position into this table, as a flat list with offsets
+    children = array('i')
+    first_child = array('i', [0]) * (TABLE_SIZE + 1)
+    # Moves per position not yet known to lose for the mover
+    unresolved = bytearray(TABLE_SIZE)
+    # Positions to settle at each distance: (result or None, index); None
+    # counts one move that reaches a won position
+    pending = {}
+
+    for index in range(TABLE_SIZE):
+        first_child[index] = len(children)
+        side, white_king, black_king, square = (index >> 18, (index >> 12) & 63,
+                                                (index >> 6) & 63, index & 63)
+        if (white_king == black_king or square in (white_king, black_king)
+                or (piece == 'P' and square >> 3 in (0, 7))):
+            values[index] = ILLEGAL
+            continue
+
+        grid[white_king >> 3][white_king & 7] = 'K'
+        grid[black_king >> 3][black_king & 7] = 'k'
+        grid[square >> 3][square & 7] = piece
+        board.king_squares = {'K': divmod(white_king, 8), 'k': divmod(black_king, 8)}
+        player, enemy = ('white', 'black') if side == 0 else ('black', 'white')
+
+        if board.is_in_check(enemy):
+            values[index] = ILLEGAL  # the side that just moved left its king in check
+        else:
+            moves = board.get_all_legal_moves(player)
+            if not moves:
+                if board.is_in_check(player):
+                    pending.setdefault(0, []).append((LOSS, index))
+                # else stalemate, a draw
+            unresolved[index] = len(moves)
+            for (from_row, from_col), (to_row, to_col) in moves:
+                moved_from, moved_to = from_row * 8 + from_col, to_row * 8 + to_col
+                if side == 1:
+                    if moved_to == square or moved_to == white_king:
+                        continue  # a capture leaves too little to win: a draw
+                    children.append(table_index(0, white_king, moved_to, square))
+                elif moved_to == black_king:
+                    continue  # capturing the king ends the game as a draw
+                elif moved_from == white_king:
+                    children.append(table_index(1, moved_to, black_king, square))
+                elif piece == 'P' and moved_to < 8:
+                    # Promotion: the result comes from the queen table
+                    result = decode(queen_table[table_index(1, white_king, black_king, moved_to)])
+                    if result[0] == LOSS:
+                        pending.setdefault(result[1] + 1, []).append((WIN, index))
+                    elif result[0] == WIN:
+                        pending.setdefault(result[1], []).append((None, index))
+                else:
+                    children.append(table_index(1, white_king, black_king, moved_to))
+
+        grid[white_king >> 3][white_king & 7] = '.'
+        grid[black_king >> 3][black_king & 7] = '.'
+        grid[square >> 3][square & 7] = '.'
+    first_child[TABLE_SIZE] = len(children)
+
+    # Reverse the moves: the positions that lead into each position
+    first_parent = array('i', [0]) * (TABLE_SIZE + 1)
+    for child in children:
+        first_parent[child + 1] += 1
+    for index in range(TABLE_SIZE):
+        first_parent[index + 1] += first_parent[index]
+    parents = array('i', [0]) * len(children)
+    fill = array('i', first_parent)
+    for index in range(TABLE_SIZE):
+        for child in children[first_child[index]:first_child[index + 1]]:
+            parents[fill[child]] = index
+            fill[child] += 1
+    del children, first_child, fill
+
+    distance = 0
+    while pending:
+        for result, index in pending.pop(distance, ()):
+            if values[index]:
+                continue
+            if result is None:
+                unresolved[index] -= 1
+                if unresolved[index] == 0:
+                    pending.setdefault(distance + 1, []).append((LOSS, index))
+                continue
+            if distance + 1 >= ILLEGAL:
+                raise ValueError(f"K{piece}K mate distance {distance} does not fit a byte")
+            values[index] = distance + 1
+            for parent in parents[first_parent[index]:first_parent[index + 1]]:
+                if values[parent]:
+                    continue
+                if result == LOSS:
+                    pending.setdefault(distance + 1, []).append((WIN, parent))
+                else:
+                    unresolved[parent] -= 1
+                    if unresolved[parent] == 0:
+                        pending.setdefault(distance + 1, []).append((LOSS, parent))
+        distance += 1
+    return values
+
+
+def write_table(path, piece, values):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, piece.encode()))
+        f.write(values)
+
+
+def build_tables(directory, pieces=TABLE_PIECES):
+    """Generate and write the tables for pieces; yield (piece, seconds) as each is done."""
+    os.makedirs(directory, exist_ok=True)
+    queen_table = None
+    # The queen table first, for promotions
+    for piece in sorted(pieces, key=lambda piece: piece != 'Q'):
+        if piece == 'P' and queen_table is None:
+            queen_table = Tablebase(directory).tables.get('Q')
+            if queen_table is None:
+                raise ValueError("KPK needs the KQK table; build it first")
+            queen_table = queen_table[HEADER.size:]
+        start = time.perf_counter()
+        values = generate_table(piece, queen_table)
+        write_table(table_path(directory, piece), piece, values)
+        if piece == 'Q':
+            queen_table = values
+        yield piece, time.perf_counter() - start
+
+
+# --- Probing ---
+
+class Tablebase:
+    def __init__(self, directory):
+        """Map every table file present in directory."""
+        self.directory = directory
+        self.tables = {}
+        for piece in TABLE_PIECES:
+            path = table_path(directory, piece)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, stored_piece = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or stored_piece != piece.encode() or len(data) != HEADER.size + TABLE_SIZE:
+                raise ValueError(f"{path} is not a K{piece}K tablebase")
+            self.tables[piece] = data
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, board, player):
+        """Return (WIN, LOSS or DRAW, plies to mate) for player to move, or None.
+
+        None means the position has more than MAX_PIECES pieces, a missing
+        king or no table. Bare kings are a draw.
+        """
+        if board.count_pieces() > MAX_PIECES:
+            return None
+        kings = {}
+        other = None
+        for piece, square in board.piece_squares():
+            if piece in 'Kk':
+                kings[piece] = square
+            else:
+                other = (piece, square)
+        if len(kings) != 2:
+            return None
+        if other is None:
+            self.hits += 1
+            return DRAW, 0
+
+        piece, square = other
+        table = self.tables.get(piece.upper())
+        if table is None:
+            self.misses += 1
+            return None
+        if piece.isupper():
+            index = table_index(0 if player == 'white' else 1, kings['K'], kings['k'], square)
+        else:
+            # Black has the piece: flip the board and swap colors
+            index = table_index(0 if player == 'black' else 1, kings['k'] ^ 56,
+                                kings['K'] ^ 56, square ^ 56)
+        result = decode(table[HEADER.size + index])
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def best_move(self, board, player):
+        """Return the move that mates fastest, holds the draw or loses slowest, or None.
+
+        None if the position or any position a move leads to is not covered.
+        """
+        if self.probe(board, player) is None:
+            return None
+        enemy = 'black' if player == 'white' else 'white'
+        best_move, best_key = None, None
+        for move in board.get_all_legal_moves(player):
+            board.make_move(*move)
+            result = self.probe(board, enemy)
+            board.unmake_move()
+            if result is None:
+                return None
+            outcome, plies = result
+            # From the mover's side: a lost reply is a win for us
+            if outcome == LOSS:
+                key = (2, -plies)
+            elif outcome == DRAW:
+                key = (1, 0)
+            else:
+                key = (0, plies)
+            if best_key is None or key > best_key:
+                best_move, best_key = move, key
+        return best_move
+
+    def stats(self):
+        return {'tables': ''.join(self.tables), 'hits': self.hits, 'misses': self.misses}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build endgame tablebases.')
+    parser.add_argument('directory', nargs='?', default='tablebases')
+    parser.add_argument('--pieces', default=TABLE_PIECES,
+                        help='white pieces to build K+piece vs K tables for')
+    args = parser.parse_args()
+
+    pieces = args.pieces.upper()
+    if set(pieces) - set(TABLE_PIECES):
+        parser.error(f"pieces must be from {TABLE_PIECES}")
+    for piece, seconds in build_tables(args.directory, pieces):
+        print(f"Wrote {table_path(args.directory, piece)} in {seconds:.1f}s")
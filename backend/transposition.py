@@ -0,0 +1,66 @@
+# backend/transposition.py
+# Fixed-size transposition table for AIPlayer.
+
+# Bound types stored with each score
+EXACT = 0
+LOWER_BOUND = 1  # search failed high: real score >= stored score
+UPPER_BOUND = 2  # search failed low: real score <= stored score
+
+
+class TranspositionTable:
+    def __init__(self, size_bits=16):
+        """Create a table of 2**size_bits slots indexed by the low hash bits."""
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        # Each slot is None or (key, depth, score, bound, best_move, age)
+        self.slots = [None] * self.size
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """Mark entries from earlier searches as stale so they get replaced first."""
+        self.age += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        self.slots = [None] * self.size
+        self.age = 0
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    def probe(self, key):
+        """Return (depth, score, bound, best_move) for key, or None on a miss."""
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1:5]
+
+    def store(self, key, depth, score, bound, best_move):
+        """Store a search result, keeping the existing entry if it is deeper and current."""
+        index = key & self.mask
+        entry = self.slots[index]
+        if entry is not None:
+            if entry[0] != key and entry[5] == self.age and entry[1] > depth:
+                return
+            self.overwrites += 1
+        self.slots[index] = (key, depth, score, bound, best_move, self.age)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self):
+        """Return the table counters as a dict."""
+        return {
+            'size': self.size,
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hit_rate,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }
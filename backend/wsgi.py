@@ -0,0 +1,15 @@
+# backend/wsgi.py
+# Production entry point. Run the web workers and the engine pool side by side:
+#
+#   cd backend
+#   gunicorn -w 4 -b 0.0.0.0:8000 wsgi:app
+#   CHESSBOT_SHARED_STORE=games.sqlite3 python3 engine.py --processes 4
+#
+# Both keep games in the SQLite file named by CHESSBOT_SHARED_STORE
+# (games.sqlite3 by default here), so any web worker can serve any game and
+# no request waits on a search.
+import os
+
+os.environ.setdefault('CHESSBOT_SHARED_STORE', 'games.sqlite3')
+
+from app import app  # noqa: E402
@@ -0,0 +1,26 @@
+# backend/zobrist.py
+# Zobrist keys shared by every board backend.
+#
+# A position hash is the XOR of one random 64-bit key per (piece, square),
+# with square = row * 8 + col. Boards update it incrementally on each move.
+import random
+
+PIECE_CHARS = 'PTBRQKptbrqk'
+
+# Fixed seed so hashes are stable across processes and restarts.
+rng = random.Random(0x5EED_C4E55)
+
+ZOBRIST_PIECE_KEYS = {piece: [rng.getrandbits(64) for _ in range(64)]
+                      for piece in PIECE_CHARS}
+# Empty squares contribute nothing, which lets callers XOR captures blindly.
+ZOBRIST_PIECE_KEYS['.'] = [0] * 64
+ZOBRIST_BLACK_TO_MOVE = rng.getrandbits(64)
+
+
+def compute_hash(board):
+    """Hash an 8x8 grid of piece characters from scratch."""
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value ^= ZOBRIST_PIECE_KEYS[board[row][col]][row * 8 + col]
+    return value
@@ -4,6 +4,9 @@ let selectedSquare = null;
 let turn = 'player'
 let opponent = 'black'
 let player = 'white'
+let gameId = null
+// Pause before asking again while the AI is still thinking
+const AI_POLL_RETRY_MS = 500
 
 const pieceImages = {
     'r': 'assets/pieces/rook-b.svg',
@@ -24,9 +27,35 @@ const pieceImages = {
 
 
 
+// Each browser tab plays its own game; the ID survives page reloads.
+async function startGame() {
+    gameId = sessionStorage.getItem('gameId');
+    if (gameId) {
+        const response = await fetch(`/games/${gameId}`);
+        if (response.ok) {
+            const data = await response.json();
+            turn = data.turn;
+            drawBoard(data.board);
+            if (turn === 'ai') {
+                fetchAiMove();
+            }
+            return;
+        }
+    }
+    try {
+        const response = await fetch('/games', { method: 'POST' });
+        const data = await response.json();
+        gameId = data.game_id;
+        sessionStorage.setItem('gameId', gameId);
+        drawBoard(data.board);
+    } catch (error) {
+        console.error('Error creating game:', error);
+    }
+}
+
 async function fetchBoard() {
     try {
-        const response = await fetch('/state');
+        const response = await fetch(`/games/${gameId}`);
         const data = await response.json();
         drawBoard(data.board);
     } catch (error) {
@@ -77,7 +106,7 @@ async function makeMove(from, to) {
     // Show player’s move right away
     
     try {
-        const response = await fetch('/move', {
+        const response = await fetch(`/games/${gameId}/move`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ from, to })
@@ -111,10 +140,16 @@ async function makeMove(from, to) {
     }
 }
 
+// Long-poll: the server holds the request until the AI has moved (or up to
+// `wait` seconds), so the move shows up as soon as it is ready.
 async function fetchAiMove(){
     try{
-        const response = await fetch('/get_ai_move')
-        const data = await response.json();
+        const response = await fetch(`/games/${gameId}/ai_move?wait=25`)
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok || data.status === 'error') {
+            addToLog(`❌ Could not get the AI move: ${data.message || response.status}`);
+            return;
+        }
         
         
         if(data.status === 'success') {
@@ -131,9 +166,16 @@ async function fetchAiMove(){
             }
             
             turn = 'player'
+        } else if (data.turn === 'player') {
+            if (data.no_legal_moves) {
+                addToLog(`🤖 AI has no legal moves`);
+            }
+            turn = 'player'
+        } else if (data.status === 'no-move' && data.turn === 'ai') {
+            // Still thinking: ask again shortly
+            setTimeout(fetchAiMove, AI_POLL_RETRY_MS);
         } else {
-            setTimeout(fetchAiMove, 1000)
-
+            addToLog(`❌ Unexpected reply while waiting for the AI`);
         }
 
 
@@ -188,7 +230,7 @@ function formatAIMove(from, to) {
 
 async function resetBoard() {
     try {
-        const response = await fetch('/reset', { method: 'POST' });
+        const response = await fetch(`/games/${gameId}/reset`, { method: 'POST' });
         const data = await response.json();
         turn = 'player'
         if (data.status === 'success') {
@@ -214,4 +256,4 @@ function disableBoard() {
 
 
 
-fetchBoard();
+startGame();